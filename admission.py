@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+"""Cost-aware admission control: per-client token buckets and priority load shedding."""
+from __future__ import annotations
+
+import asyncio
+import math
+import time
+from collections import OrderedDict, deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl
+
+import serializers
+
+# Relative cost of one request with the default count (one palette = 1).
+ROUTE_COSTS = {
+    "/api/palette": 1.0,
+    "/api/export": 1.0,
+    "/api/scale": 1.0,
+    "/api/presets": 0.5,
+    "/api/presets/similar": 1.0,
+    "/api/ai-palettes": 3.0,
+    "/api/bundle": 4.0,
+    "/api/brand/palette": 3.0,
+}
+# /api/palettes/stream is not priced up front: its handler reserves each
+# chunk of palettes through AdmissionController.reserve as it generates it.
+# Routes whose JSON body is read up front to size the request.
+PEEK_ROUTES = frozenset(
+    {"/api/palette", "/api/export", "/api/scale", "/api/ai-palettes", "/api/bundle"}
+)
+PEEK_MAX_BYTES = 64 * 1024
+DEFAULT_COUNT = 5
+SCALE_STEPS_PER_UNIT = 100
+
+
+def estimate_cost(path: str, params: Dict[str, Any]) -> float:
+    """Cost units of a request from its route and ``count`` (or scale ``steps``).
+
+    Generation is linear in ``count``; the full contrast matrix adds a
+    quadratic term on top.
+    """
+    cost = ROUTE_COSTS[path]
+    if path == "/api/scale":
+        return cost * max(1.0, _number(params.get("steps"), 0) / SCALE_STEPS_PER_UNIT)
+    size = max(1.0, _number(params.get("count"), DEFAULT_COUNT) / DEFAULT_COUNT)
+    cost *= size
+    if params.get("contrast_matrix") in (True, "true", "1"):
+        cost *= size
+    return cost
+
+
+def _number(value: Any, default: float) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, status: int, retry_after: float, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+        self.message = message
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float, now: float) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = now
+
+    def take(self, cost: float, now: float) -> float:
+        """Spend ``cost`` tokens, or return the seconds until they are available."""
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= cost:
+            self.tokens -= cost
+            return 0.0
+        return (cost - self.tokens) / self.rate
+
+    def refund(self, cost: float) -> None:
+        self.tokens = min(self.burst, self.tokens + cost)
+
+
+class AdmissionController:
+    """Admits requests while their summed cost fits in ``capacity``.
+
+    A request costing more than ``burst`` could never be paid for and is
+    refused outright (413). Otherwise each client first pays the cost from
+    its own token bucket (``rate`` per second up to ``burst``; 429 when
+    empty). The request then needs room in the shared in-flight budget:
+    bulk requests may only use ``bulk_share`` of it and are shed at once
+    (503) when it is full, while interactive requests wait in a short FIFO
+    queue for up to ``queue_timeout`` seconds before being shed. Bulk
+    requests never jump ahead of waiting interactive ones, and a request
+    larger than its budget runs only when nothing else is in flight.
+    Streams reserve one chunk at a time through ``reserve``, which waits
+    instead of failing. A rate or capacity of 0 disables that check.
+    Everything runs on the event loop, so no locking is needed.
+    """
+
+    def __init__(
+        self,
+        capacity: float,
+        rate: float,
+        burst: float,
+        bulk_share: float = 0.5,
+        queue_timeout: float = 0.25,
+        max_waiters: int = 256,
+        max_clients: int = 10_000,
+        retry_after: float = 1.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.capacity = capacity
+        self.rate = rate
+        self.burst = max(burst, 1.0)
+        self.bulk_share = bulk_share
+        self.queue_timeout = queue_timeout
+        self.max_waiters = max_waiters
+        self.max_clients = max_clients
+        self.retry_after = retry_after
+        self.clock = clock
+        self.in_flight = 0.0
+        self.admitted = 0
+        self.queued = 0
+        self.rate_limited = 0
+        self.too_large = 0
+        self.shed = 0
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self._waiters: Deque[Tuple[float, "asyncio.Future[None]"]] = deque()
+        self._bulk_waiters: Deque[Tuple[float, "asyncio.Future[None]"]] = deque()
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "rate_limited": self.rate_limited,
+            "too_large": self.too_large,
+            "shed": self.shed,
+            "in_flight": self.in_flight,
+            "waiting": len(self._waiters),
+            "bulk_waiting": len(self._bulk_waiters),
+            "clients": len(self._buckets),
+        }
+
+    def too_costly(self, cost: float) -> bool:
+        """Whether ``cost`` exceeds what any client's bucket can ever hold."""
+        return self.rate > 0 and cost > self.burst
+
+    async def admit(self, client: str, cost: float, bulk: bool) -> float:
+        """Reserve capacity for a request; returns the cost to ``release`` afterwards."""
+        self._check_size(cost)
+        bucket = self._charge(client, cost)
+        if self.capacity <= 0:
+            self.admitted += 1
+            return 0.0
+        if self._fits(cost, bulk) and not (bulk and (self._waiters or self._bulk_waiters)):
+            self.in_flight += cost
+            self.admitted += 1
+            return cost
+        if not bulk and len(self._waiters) < self.max_waiters:
+            if await self._wait(self._waiters, cost, self.queue_timeout):
+                self.admitted += 1
+                return cost
+        if bucket is not None:
+            bucket.refund(cost)
+        self.shed += 1
+        raise AdmissionRejected(503, self.retry_after, "Servidor saturado, inténtalo de nuevo en unos segundos.")
+
+    async def reserve(self, client: str, cost: float) -> float:
+        """Reserve bulk capacity for one chunk of a stream, waiting instead of failing.
+
+        A stream has already sent its status line, so an empty bucket or a
+        full budget slows it down rather than cutting it short.
+        """
+        self._check_size(cost)
+        while True:
+            try:
+                self._charge(client, cost)
+                break
+            except AdmissionRejected as exc:
+                await asyncio.sleep(exc.retry_after)
+        if self.capacity <= 0:
+            self.admitted += 1
+            return 0.0
+        if not (self._waiters or self._bulk_waiters) and self._fits(cost, True):
+            self.in_flight += cost
+        else:
+            await self._wait(self._bulk_waiters, cost, None)
+        self.admitted += 1
+        return cost
+
+    def release(self, cost: float) -> None:
+        self.in_flight = max(0.0, self.in_flight - cost)
+        while self._waiters and self._fits(self._waiters[0][0], False):
+            self._wake(self._waiters)
+        while not self._waiters and self._bulk_waiters and self._fits(self._bulk_waiters[0][0], True):
+            self._wake(self._bulk_waiters)
+
+    def _check_size(self, cost: float) -> None:
+        if self.too_costly(cost):
+            # No amount of waiting makes it fit, so it is not worth retrying.
+            self.too_large += 1
+            raise AdmissionRejected(413, 0.0, "Petición demasiado costosa, reduce count o steps.")
+
+    def _fits(self, cost: float, bulk: bool) -> bool:
+        limit = self.capacity * (self.bulk_share if bulk else 1.0)
+        return self.in_flight + cost <= limit or self.in_flight == 0
+
+    def _wake(self, waiters: Deque[Tuple[float, "asyncio.Future[None]"]]) -> None:
+        cost, future = waiters.popleft()
+        self.in_flight += cost
+        future.set_result(None)
+
+    async def _wait(
+        self,
+        waiters: Deque[Tuple[float, "asyncio.Future[None]"]],
+        cost: float,
+        timeout: Optional[float],
+    ) -> bool:
+        """Queue for ``cost``; True once ``release`` has counted it as in flight."""
+        future: "asyncio.Future[None]" = asyncio.get_running_loop().create_future()
+        waiter = (cost, future)
+        waiters.append(waiter)
+        self.queued += 1
+        try:
+            await asyncio.wait({future}, timeout=timeout)
+        except asyncio.CancelledError:
+            # Client went away while queued: give back whatever it holds.
+            if future.done():
+                self.release(cost)
+            else:
+                waiters.remove(waiter)
+                future.cancel()
+            raise
+        if future.done():
+            return True
+        waiters.remove(waiter)
+        future.cancel()
+        return False
+
+    def _charge(self, client: str, cost: float) -> Optional[TokenBucket]:
+        if self.rate <= 0:
+            return None
+        now = self.clock()
+        bucket = self._buckets.get(client)
+        if bucket is None:
+            bucket = self._buckets[client] = TokenBucket(self.rate, self.burst, now)
+            if len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(client)
+        wait = bucket.take(cost, now)
+        if wait > 0:
+            self.rate_limited += 1
+            raise AdmissionRejected(429, wait, "Demasiadas peticiones, espera antes de reintentar.")
+        return bucket
+
+
+class AdmissionMiddleware:
+    """ASGI middleware applying an AdmissionController to the palette API routes.
+
+    Small JSON bodies are read before the app sees them (and replayed) so
+    ``count`` can be priced; image bodies are priced from the route and
+    query string only. Rejections are answered right away (with
+    ``Retry-After`` when retrying can help) and never reach the app.
+    """
+
+    def __init__(
+        self, app: Any, controller: AdmissionController, client_header: str = ""
+    ) -> None:
+        self.app = app
+        self.controller = controller
+        self.client_header = client_header
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        path = scope.get("path", "")
+        if scope["type"] != "http" or path not in ROUTE_COSTS:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        params: Dict[str, Any] = dict(parse_qsl(scope.get("query_string", b"").decode("latin-1")))
+        if path in PEEK_ROUTES:
+            messages, body = await _peek_body(receive)
+            receive = _replay(messages, receive)
+            if isinstance(body, dict):
+                params.update(body)
+        cost = estimate_cost(path, params)
+        bulk = headers.get(b"x-priority", b"").lower() == b"bulk"
+        try:
+            reserved = await self.controller.admit(client_key(scope, self.client_header), cost, bulk)
+        except AdmissionRejected as exc:
+            await _send_rejection(send, exc)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release(reserved)
+
+
+def client_key(scope: Dict[str, Any], client_header: str = "") -> str:
+    """Bucket key for a request: the first entry of ``client_header`` or the peer address."""
+    if client_header:
+        name = client_header.lower().encode("latin-1")
+        for header, value in scope.get("headers") or []:
+            if header == name and value:
+                # X-Forwarded-For style lists: the first entry is the original client.
+                return value.split(b",")[0].strip().decode("latin-1")
+    client = scope.get("client")
+    return client[0] if client else "anonymous"
+
+
+async def _peek_body(receive: Any) -> Tuple[List[Dict[str, Any]], Any]:
+    """Messages read from ``receive`` and the parsed JSON body (None if too large or invalid)."""
+    messages = []
+    size = 0
+    while True:
+        message = await receive()
+        messages.append(message)
+        if message["type"] != "http.request":
+            return messages, None
+        size += len(message.get("body", b""))
+        if size > PEEK_MAX_BYTES:
+            return messages, None
+        if not message.get("more_body"):
+            break
+    try:
+        return messages, serializers.loads(b"".join(message.get("body", b"") for message in messages))
+    except ValueError:
+        return messages, None
+
+
+def _replay(messages: List[Dict[str, Any]], receive: Any) -> Any:
+    pending = deque(messages)
+
+    async def replay() -> Dict[str, Any]:
+        if pending:
+            return pending.popleft()
+        return await receive()
+
+    return replay
+
+
+async def _send_rejection(send: Any, exc: AdmissionRejected) -> None:
+    body = serializers.dumps({"error": exc.message})
+    headers = [
+        (b"content-type", b"application/json"),
+        (b"content-length", str(len(body)).encode("latin-1")),
+    ]
+    if exc.retry_after > 0:
+        headers.append((b"retry-after", str(max(1, math.ceil(exc.retry_after))).encode("latin-1")))
+    await send({"type": "http.response.start", "status": exc.status, "headers": headers})
+    await send({"type": "http.response.body", "body": body})
@@ -2,34 +2,218 @@
 """FastAPI web app and API for palette generation."""
 from __future__ import annotations
 
-import json
+import asyncio
+import contextvars
+import hashlib
 import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
 from datetime import datetime, timezone
-from typing import Any, Dict, List, Optional
+from functools import partial
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple, Union
 
-from fastapi import FastAPI, Request
-from fastapi.responses import JSONResponse, HTMLResponse
+from fastapi import FastAPI, Query, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import (
+    HTMLResponse,
+    JSONResponse,
+    PlainTextResponse,
+    Response,
+    StreamingResponse,
+)
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from pydantic import BaseModel
+from pydantic import BaseModel, ValidationError, field_validator
 
+import metrics
+import serializers
+from admission import AdmissionController, AdmissionMiddleware, client_key, estimate_cost
+from brand_colors import BrandColorExtractor, LogoTooLarge, extract_brand_colors
+from export_engine import export_file, export_palette, iter_zip, unsupported_formats
+from live_editor import LiveSession, coalesce_ops
 from palette_core import (
-    export_tokens_to_css,
-    export_tokens_to_figma,
-    export_tokens_to_tailwind,
+    AI_VARIATION_STYLES,
+    PROFILE_RESOLVER,
+    PROFILES,
+    STYLE_MODIFIERS,
+    PaletteSpec,
+    ai_variation_specs,
+    conversion_cache_info,
     generate_ai_variations,
     generate_palette,
+    generate_palette_bundle,
+    generate_palettes_batch,
+    pack_palette_result,
+    personalize_palette,
+    resolve_contrast_target,
+    resolve_profile,
+    set_stage_observer,
+)
+from palette_cache import (
+    InMemorySharedBackend,
+    LocalTTLCache,
+    PaletteResultCache,
+    make_cache_key,
 )
+from palette_pool import PalettePool
+from preset_store import BackgroundPresetWriter, PresetStore
+from scales import MAX_STEPS, MIN_STEPS, SCALE_KINDS, generate_scale
+from similarity_index import PresetSimilarityIndex
 
-app = FastAPI(title="Web Palette Agent")
 BASE_DIR = os.path.dirname(__file__)
 DATA_DIR = os.path.join(BASE_DIR, "data")
 PRESETS_PATH = os.path.join(DATA_DIR, "presets.json")
+PRESETS_DB_URL = os.environ.get(
+    "PRESETS_DB_URL", f"sqlite:///{os.path.join(DATA_DIR, 'presets.db')}"
+)
+PRESETS_COMPACT_EVERY = int(os.environ.get("PRESETS_COMPACT_EVERY", "1000"))
+PRESETS_PAGE_MAX = 500
+SIMILAR_PRESETS_MAX = 50
+PALETTE_CACHE_SIZE = int(os.environ.get("PALETTE_CACHE_SIZE", "1024"))
+PALETTE_CACHE_TTL = float(os.environ.get("PALETTE_CACHE_TTL", "300"))
+PALETTE_SHARED_CACHE = os.environ.get("PALETTE_SHARED_CACHE", "")
+PRESETS_FLUSH = os.environ.get("PRESETS_FLUSH", "background")
+PRESETS_QUEUE_SIZE = int(os.environ.get("PRESETS_QUEUE_SIZE", "1000"))
+PALETTE_EXECUTOR = os.environ.get("PALETTE_EXECUTOR", "thread")
+PALETTE_WORKERS = int(os.environ.get("PALETTE_WORKERS", str(os.cpu_count() or 4)))
+STREAM_CHUNK_SIZE = 32
+STREAM_CHUNK_COST = 32.0
+PALETTE_POOL_SIZE = int(os.environ.get("PALETTE_POOL_SIZE", "8"))
+PALETTE_POOL_COUNTS = [
+    int(count) for count in os.environ.get("PALETTE_POOL_COUNTS", "5").split(",") if count.strip()
+]
+PALETTE_POOL_MAX_COUNT = 32
+LOGO_MAX_BYTES = int(os.environ.get("LOGO_MAX_BYTES", str(5 * 1024 * 1024)))
+LOGO_CACHE_SIZE = int(os.environ.get("LOGO_CACHE_SIZE", "1024"))
+LOGO_MAX_COLORS = 12
+LIVE_EDIT_INTERVAL = float(os.environ.get("LIVE_EDIT_INTERVAL_MS", "33")) / 1000
+LIVE_EDIT_QUEUE_SIZE = 256
+# Admission control, in cost units (one default palette = 1); 0 disables a check.
+# Requests larger than the capacity still run alone; the floor keeps small hosts
+# from serializing ordinary traffic.
+ADMISSION_CAPACITY = float(
+    os.environ.get("ADMISSION_CAPACITY", str(max(PALETTE_WORKERS, 4) * 8))
+)
+ADMISSION_RATE = float(os.environ.get("ADMISSION_RATE", "20"))
+ADMISSION_BURST = float(os.environ.get("ADMISSION_BURST", "60"))
+ADMISSION_BULK_SHARE = float(os.environ.get("ADMISSION_BULK_SHARE", "0.5"))
+ADMISSION_QUEUE_MS = float(os.environ.get("ADMISSION_QUEUE_MS", "250"))
+ADMISSION_CLIENT_HEADER = os.environ.get("ADMISSION_CLIENT_HEADER", "")
+PROFILE_SLOW_MS = float(os.environ.get("PROFILE_SLOW_MS", "0"))
+PROFILE_SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", "1.0"))
+PROFILE_DIR = os.environ.get("PROFILE_DIR", os.path.join(DATA_DIR, "profiles"))
+
+preset_store = PresetStore(
+    PRESETS_DB_URL,
+    legacy_json_path=PRESETS_PATH,
+    compact_every=PRESETS_COMPACT_EVERY,
+)
+preset_writer = BackgroundPresetWriter(
+    preset_store, maxsize=PRESETS_QUEUE_SIZE, flush=PRESETS_FLUSH
+)
+similarity_index = PresetSimilarityIndex()
+preset_store.add_listener(similarity_index.add_entries)
+palette_cache = PaletteResultCache(
+    PALETTE_CACHE_SIZE,
+    PALETTE_CACHE_TTL,
+    shared=InMemorySharedBackend() if PALETTE_SHARED_CACHE == "memory" else None,
+)
+response_cache = LocalTTLCache(PALETTE_CACHE_SIZE, PALETTE_CACHE_TTL)
+palette_pool = PalettePool(PALETTE_POOL_SIZE)
+brand_extractor = BrandColorExtractor(LOGO_CACHE_SIZE)
+admission = AdmissionController(
+    ADMISSION_CAPACITY,
+    ADMISSION_RATE,
+    ADMISSION_BURST,
+    bulk_share=ADMISSION_BULK_SHARE,
+    queue_timeout=ADMISSION_QUEUE_MS / 1000,
+)
+_generation_executor: Optional[Executor] = None
+
+
+def generation_executor() -> Executor:
+    global _generation_executor
+    if _generation_executor is None:
+        if PALETTE_EXECUTOR == "process":
+            _generation_executor = ProcessPoolExecutor(max_workers=PALETTE_WORKERS)
+        else:
+            _generation_executor = ThreadPoolExecutor(
+                max_workers=PALETTE_WORKERS, thread_name_prefix="palette"
+            )
+    return _generation_executor
+
+
+async def run_generation(function: Callable[..., Any], *args: Any) -> Any:
+    """Run CPU-bound palette generation off the event loop."""
+    loop = asyncio.get_running_loop()
+    call = partial(function, *args)
+    if PALETTE_EXECUTOR != "process":
+        # Worker threads share the request context so palette_core stage
+        # timings (and profiles) are attributed to the right request.
+        call = partial(contextvars.copy_context().run, metrics.profiled(call))
+    with metrics.stage("generate"):
+        return await loop.run_in_executor(generation_executor(), call)
+
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI) -> AsyncIterator[None]:
+    global _generation_executor
+    await preset_writer.start()
+    palette_pool.warm(
+        {
+            palette_pool_key(request): request_spec(request)
+            for request in (
+                PaletteRequest(sentiment=sentiment, style=style, count=count)
+                for sentiment in PROFILES
+                for style in (None, *STYLE_MODIFIERS)
+                for count in PALETTE_POOL_COUNTS
+            )
+        }
+    )
+    await palette_pool.start(partial(run_generation, generate_palettes_batch))
+    try:
+        yield
+    finally:
+        await palette_pool.stop()
+        await preset_writer.stop()
+        if _generation_executor is not None:
+            _generation_executor.shutdown(wait=False)
+            _generation_executor = None
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered through the shared serializer (orjson when available)."""
+
+    def render(self, content: Any) -> bytes:
+        return serializers.dumps(content)
+
+
+app = FastAPI(
+    title="Web Palette Agent", lifespan=lifespan, default_response_class=FastJSONResponse
+)
+app.add_middleware(AdmissionMiddleware, controller=admission, client_header=ADMISSION_CLIENT_HEADER)
+# Added last, so it wraps admission: shed requests still show up in the metrics.
+app.add_middleware(
+    metrics.TimingMiddleware,
+    profile_slow_ms=PROFILE_SLOW_MS,
+    sample_rate=PROFILE_SAMPLE_RATE,
+    profile_dir=PROFILE_DIR,
+)
+set_stage_observer(metrics.record_stage)
 
 app.mount("/static", StaticFiles(directory=os.path.join(BASE_DIR, "static")), name="static")
 templates = Jinja2Templates(directory=os.path.join(BASE_DIR, "templates"))
 
 
+def validate_base_hues(value: Optional[List[int]]) -> Optional[List[int]]:
+    if value is not None:
+        if not 1 <= len(value) <= LOGO_MAX_COLORS:
+            raise ValueError(f"base_hues admite de 1 a {LOGO_MAX_COLORS} tonos.")
+        if any(not 0 <= hue < 360 for hue in value):
+            raise ValueError("Cada tono de base_hues debe estar entre 0 y 359.")
+    return value
+
+
 class PaletteRequest(BaseModel):
     sentiment: str = ""
     idea: str = ""
@@ -37,35 +221,303 @@ class PaletteRequest(BaseModel):
     seed: Optional[int] = None
     style: Optional[str] = None
     brand: Optional[str] = None
+    contrast_matrix: bool = False
+    target_contrast: Optional[str | float] = None
+    simulate_cvd: bool = False
+    base_hues: Optional[List[int]] = None
+
+    @field_validator("target_contrast")
+    @classmethod
+    def check_target_contrast(cls, value: Optional[str | float]) -> Optional[str | float]:
+        if value is not None:
+            resolve_contrast_target(value)
+        return value
+
+    @field_validator("base_hues")
+    @classmethod
+    def check_base_hues(cls, value: Optional[List[int]]) -> Optional[List[int]]:
+        return validate_base_hues(value)
 
 
 class ExportRequest(PaletteRequest):
     format: str = "css"
+    formats: Optional[List[str]] = None
+    preset_id: Optional[int] = None
+
+
+class BundleRequest(PaletteRequest):
+    formats: List[str] = ["css"]
+    variations: bool = True
+
+
+class ScaleRequest(BaseModel):
+    sentiment: str = ""
+    idea: str = ""
+    style: Optional[str] = None
+    kind: str = "sequential"
+    steps: int = 10
+    monotonic: bool = True
+    base_hues: Optional[List[int]] = None
+
+    @field_validator("base_hues")
+    @classmethod
+    def check_base_hues(cls, value: Optional[List[int]]) -> Optional[List[int]]:
+        return validate_base_hues(value)
+
+    @field_validator("kind")
+    @classmethod
+    def check_kind(cls, value: str) -> str:
+        value = value.lower()
+        if value not in SCALE_KINDS:
+            raise ValueError(f"kind debe ser uno de: {', '.join(SCALE_KINDS)}.")
+        return value
+
+    @field_validator("steps")
+    @classmethod
+    def check_steps(cls, value: int) -> int:
+        if not MIN_STEPS <= value <= MAX_STEPS:
+            raise ValueError(f"steps debe estar entre {MIN_STEPS} y {MAX_STEPS}.")
+        return value
+
+
+class SimilarPresetsRequest(BaseModel):
+    colors: List[str] = []
+    preset_id: Optional[int] = None
+    k: int = 5
 
 
 def load_presets() -> List[Dict[str, Any]]:
-    if not os.path.exists(PRESETS_PATH):
-        return []
-    with open(PRESETS_PATH, "r", encoding="utf-8") as file:
-        return json.load(file)
+    return preset_store.load_all()
+
 
+async def save_preset(entry: Dict[str, Any]) -> None:
+    with metrics.stage("preset_save"):
+        await preset_writer.submit(entry)
 
-def save_preset(entry: Dict[str, Any]) -> None:
-    os.makedirs(DATA_DIR, exist_ok=True)
-    presets = load_presets()
-    presets.append(entry)
-    with open(PRESETS_PATH, "w", encoding="utf-8") as file:
-        json.dump(presets, file, ensure_ascii=False, indent=2)
 
+async def record_preset(palette: Dict[str, Any]) -> None:
+    await save_preset(
+        {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "sentiment": palette.get("sentiment"),
+            "idea": palette.get("idea"),
+            "style": palette.get("style"),
+            "brand_hint": palette.get("brand_hint"),
+            "palette": palette.get("palette"),
+        }
+    )
 
-def palette_payload(payload: PaletteRequest) -> Dict[str, Any]:
-    return generate_palette(
+
+async def palette_payload(payload: PaletteRequest) -> Dict[str, Any]:
+    return await run_generation(
+        generate_palette,
         payload.sentiment,
         payload.idea,
         payload.count,
         payload.seed,
         payload.style,
         payload.brand,
+        payload.contrast_matrix,
+        payload.target_contrast,
+        payload.simulate_cvd,
+        payload.base_hues,
+    )
+
+
+def palette_cache_key(payload: PaletteRequest) -> Optional[str]:
+    if payload.seed is None:
+        return None
+    profile, style_key = resolve_profile(payload.sentiment, payload.style, payload.idea)
+    return make_cache_key(
+        "palette",
+        profile.name,
+        style_key,
+        payload.count,
+        payload.seed,
+        bool(payload.brand),
+        payload.contrast_matrix,
+        resolve_contrast_target(payload.target_contrast)
+        if payload.target_contrast is not None
+        else None,
+        payload.simulate_cvd,
+        tuple(payload.base_hues) if payload.base_hues else None,
+    )
+
+
+def palette_pool_key(payload: PaletteRequest) -> Optional[str]:
+    # Brand-seeded requests are too varied to pool.
+    if (
+        payload.seed is not None
+        or payload.base_hues
+        or not 1 <= payload.count <= PALETTE_POOL_MAX_COUNT
+    ):
+        return None
+    profile, style_key = resolve_profile(payload.sentiment, payload.style, payload.idea)
+    if style_key and style_key not in STYLE_MODIFIERS:
+        # Unknown styles are echoed back verbatim, so they cannot share a pool.
+        return None
+    return make_cache_key(
+        "pool",
+        profile.name,
+        style_key,
+        payload.count,
+        payload.contrast_matrix,
+        resolve_contrast_target(payload.target_contrast)
+        if payload.target_contrast is not None
+        else None,
+        payload.simulate_cvd,
+    )
+
+
+def request_spec(payload: PaletteRequest) -> PaletteSpec:
+    return PaletteSpec(
+        payload.sentiment,
+        payload.style,
+        payload.seed,
+        payload.count,
+        payload.idea,
+        payload.brand,
+        payload.contrast_matrix,
+        payload.target_contrast,
+        payload.simulate_cvd,
+        tuple(payload.base_hues) if payload.base_hues else None,
+    )
+
+
+def variations_cache_key(payload: PaletteRequest) -> Optional[str]:
+    if payload.seed is None:
+        return None
+    profile, _style_key = resolve_profile(payload.sentiment, None, payload.idea)
+    return make_cache_key("variations", profile.name, payload.count, payload.seed)
+
+
+def personalize_variations(
+    variations: List[Dict[str, Any]], payload: PaletteRequest
+) -> List[Dict[str, Any]]:
+    return [
+        personalize_palette(variation, payload.sentiment, payload.idea, None)
+        for variation in variations
+    ]
+
+
+async def cached_palette(payload: PaletteRequest) -> Dict[str, Any]:
+    key = palette_cache_key(payload)
+    if key is None:
+        pool_key = palette_pool_key(payload)
+        palette = palette_pool.take(pool_key, request_spec(payload)) if pool_key else None
+        if palette is None:
+            return await palette_payload(payload)
+        return personalize_palette(palette, payload.sentiment, payload.idea, payload.brand)
+    palette = palette_cache.get(key)
+    if palette is None:
+        palette = await palette_payload(payload)
+        palette_cache.set(key, palette)
+    return personalize_palette(palette, payload.sentiment, payload.idea, payload.brand)
+
+
+async def cached_variations(payload: PaletteRequest) -> List[Dict[str, Any]]:
+    key = variations_cache_key(payload)
+    variations = palette_cache.get(key) if key else None
+    if variations is None:
+        variations = await run_generation(
+            generate_ai_variations, payload.sentiment, payload.idea, payload.count, payload.seed
+        )
+        if key is None:
+            return variations
+        palette_cache.set(key, variations)
+    return personalize_variations(variations, payload)
+
+
+@dataclass(frozen=True)
+class PreparedResponse:
+    """Serialized JSON body (plus the preset it records) ready to be sent again."""
+
+    body: bytes
+    etag: Optional[str]
+    preset: Optional[Dict[str, Any]] = None
+
+
+def prepare_response(
+    content: Any, seeded: bool, preset: Optional[Dict[str, Any]] = None
+) -> PreparedResponse:
+    body = serializers.dumps(content)
+    etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"' if seeded else None
+    return PreparedResponse(body, etag, preset)
+
+
+def send_prepared(request: Request, prepared: PreparedResponse) -> Response:
+    """JSON response with ETag/Cache-Control; seeded results are immutable for the TTL."""
+    if prepared.etag is None:
+        headers = {"Cache-Control": "no-store"}
+    else:
+        headers = {
+            "ETag": prepared.etag,
+            "Cache-Control": f"public, max-age={int(PALETTE_CACHE_TTL)}",
+        }
+        if prepared.etag in request.headers.get("if-none-match", ""):
+            return Response(status_code=304, headers=headers)
+    return Response(prepared.body, media_type="application/json", headers=headers)
+
+
+def cacheable_response(request: Request, content: Any, seeded: bool) -> Response:
+    return send_prepared(request, prepare_response(content, seeded))
+
+
+ResponseBuilder = Callable[[], Awaitable[Union[Response, Tuple[Any, Optional[Dict[str, Any]]]]]]
+
+
+def response_cache_key(kind: str, payload: BaseModel, cacheable: bool) -> Optional[str]:
+    if not cacheable:
+        return None
+    return make_cache_key("response", kind, payload.model_dump(mode="json"))
+
+
+async def respond(request: Request, key: Optional[str], build: ResponseBuilder) -> Response:
+    """Send a deterministic response from pre-serialized bytes, building it on a miss.
+
+    ``build`` returns ``(content, preset)``, where ``preset`` is the palette
+    to record as a preset (or None), or a Response to send as is (errors).
+    Hits skip generation, personalization and serialization entirely.
+    """
+    prepared = response_cache.get(key) if key else None
+    if prepared is None:
+        result = await build()
+        if isinstance(result, Response):
+            return result
+        content, preset = result
+        if key is None:
+            prepared = prepare_response(content, False, preset)
+        else:
+            prepared = prepare_response(content, True, pack_palette_result(preset))
+            response_cache.set(key, prepared)
+    if prepared.preset is not None:
+        await record_preset(prepared.preset)
+    return send_prepared(request, prepared)
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint() -> PlainTextResponse:
+    gauges: Dict[str, float] = {}
+    for name, stats in conversion_cache_info().items():
+        gauges[f"palette_conversion_cache_hits{{function=\"{name}\"}}"] = stats["hits"]
+        gauges[f"palette_conversion_cache_misses{{function=\"{name}\"}}"] = stats["misses"]
+    for name, value in palette_cache.stats().items():
+        gauges[f"palette_result_cache_{name}"] = value
+    gauges["palette_response_cache_hits"] = response_cache.hits
+    gauges["palette_response_cache_misses"] = response_cache.misses
+    gauges["palette_response_cache_size"] = len(response_cache)
+    for name, value in palette_pool.stats().items():
+        gauges[f"palette_pool_{name}"] = value
+    for name, value in admission.stats().items():
+        gauges[f"palette_admission_{name}"] = value
+    gauges["palette_logo_cache_hits"] = brand_extractor.cache.hits
+    gauges["palette_logo_cache_misses"] = brand_extractor.cache.misses
+    gauges["palette_logo_cache_size"] = len(brand_extractor.cache)
+    resolver_cache = PROFILE_RESOLVER.match_sentiment.cache_info()
+    gauges["palette_resolver_cache_hits"] = resolver_cache.hits
+    gauges["palette_resolver_cache_misses"] = resolver_cache.misses
+    return PlainTextResponse(
+        metrics.registry.render(gauges), media_type="text/plain; version=0.0.4"
     )
 
 
@@ -75,46 +527,522 @@ async def index(request: Request) -> HTMLResponse:
 
 
 @app.post("/api/palette")
-async def api_palette(payload: PaletteRequest) -> JSONResponse:
-    palette = palette_payload(payload)
-    preset_entry = {
-        "created_at": datetime.now(timezone.utc).isoformat(),
-        "sentiment": palette.get("sentiment"),
-        "idea": palette.get("idea"),
-        "style": palette.get("style"),
-        "brand_hint": palette.get("brand_hint"),
-        "palette": palette.get("palette"),
-    }
-    save_preset(preset_entry)
-    return JSONResponse(palette)
+async def api_palette(payload: PaletteRequest, request: Request) -> Response:
+    async def build() -> Tuple[Any, Optional[Dict[str, Any]]]:
+        palette = await cached_palette(payload)
+        return palette, palette
+
+    key = response_cache_key("palette", payload, payload.seed is not None)
+    return await respond(request, key, build)
+
+
+async def read_limited_body(request: Request, limit: int) -> Optional[bytes]:
+    """Request body, or None as soon as it grows past ``limit`` bytes."""
+    chunks = []
+    size = 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        if size > limit:
+            return None
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+async def logo_colors(data: bytes, count: int) -> Dict[str, Any]:
+    result = brand_extractor.get(data, count)
+    if result is None:
+        with metrics.stage("logo"):
+            result = await run_generation(extract_brand_colors, data, count)
+        brand_extractor.set(data, count, result)
+    return result
+
+
+@app.post("/api/brand/palette")
+async def api_brand_palette(
+    request: Request,
+    sentiment: str = "",
+    idea: str = "",
+    style: Optional[str] = None,
+    count: int = 5,
+    seed: Optional[int] = None,
+    brand: Optional[str] = None,
+    colors: int = Query(5, ge=1, le=LOGO_MAX_COLORS),
+) -> Response:
+    """Palette seeded with the dominant hues of the logo sent as the raw request body."""
+    data = await read_limited_body(request, LOGO_MAX_BYTES)
+    if data is None:
+        return FastJSONResponse({"error": "La imagen supera el tamaño máximo."}, status_code=413)
+    if not data:
+        return FastJSONResponse(
+            {"error": "Envía la imagen del logo en el cuerpo de la petición."}, status_code=400
+        )
+    try:
+        logo = await logo_colors(data, colors)
+    except LogoTooLarge as exc:
+        return FastJSONResponse({"error": str(exc)}, status_code=413)
+    except ValueError as exc:
+        return FastJSONResponse({"error": str(exc)}, status_code=400)
+    except RuntimeError as exc:
+        return FastJSONResponse({"error": str(exc)}, status_code=503)
+    try:
+        payload = PaletteRequest(
+            sentiment=sentiment,
+            idea=idea,
+            style=style,
+            count=count,
+            seed=seed,
+            brand=brand,
+            base_hues=logo["base_hues"][:LOGO_MAX_COLORS] or None,
+        )
+    except ValidationError:
+        return FastJSONResponse({"error": "Petición no válida."}, status_code=400)
+    palette = await cached_palette(payload)
+    await record_preset(palette)
+    return FastJSONResponse({**palette, "logo": logo})
+
+
+def normalize_timestamp(value: Optional[str]) -> Optional[str]:
+    if value is None:
+        return None
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc).isoformat()
 
 
 @app.get("/api/presets")
-async def api_presets() -> JSONResponse:
-    return JSONResponse(load_presets())
+async def api_presets(
+    limit: int = Query(50, ge=1, le=PRESETS_PAGE_MAX),
+    cursor: Optional[int] = None,
+    sentiment: Optional[str] = None,
+    style: Optional[str] = None,
+    brand_hint: Optional[str] = None,
+    created_from: Optional[str] = None,
+    created_to: Optional[str] = None,
+) -> Response:
+    try:
+        created_from = normalize_timestamp(created_from)
+        created_to = normalize_timestamp(created_to)
+    except ValueError:
+        return FastJSONResponse({"error": "Fecha no válida, usa formato ISO 8601."}, status_code=400)
+    with metrics.stage("preset_load"):
+        presets, next_cursor = await asyncio.to_thread(
+            preset_store.query,
+            limit=limit,
+            cursor=cursor,
+            sentiment=sentiment,
+            style=style,
+            brand_hint=brand_hint,
+            created_from=created_from,
+            created_to=created_to,
+        )
+    return FastJSONResponse({"presets": presets, "next_cursor": next_cursor})
+
+
+@app.post("/api/presets/similar")
+async def api_similar_presets(payload: SimilarPresetsRequest) -> Response:
+    # Picks up presets saved by other workers since the last query.
+    await asyncio.to_thread(similarity_index.refresh, preset_store.load_after)
+    colors: Any = payload.colors
+    if payload.preset_id is not None:
+        preset = await asyncio.to_thread(preset_store.get, payload.preset_id)
+        if preset is None:
+            return FastJSONResponse({"error": "Preset no encontrado."}, status_code=404)
+        colors = preset["palette"]
+    if not colors:
+        return FastJSONResponse({"error": "Indica colores o un preset_id."}, status_code=400)
+    k = max(1, min(payload.k, SIMILAR_PRESETS_MAX))
+    try:
+        with metrics.stage("similar"):
+            matches = await asyncio.to_thread(
+                similarity_index.query, colors, k, payload.preset_id
+            )
+    except ValueError:
+        return FastJSONResponse({"error": "Color hexadecimal no válido."}, status_code=400)
+    presets = await asyncio.to_thread(preset_store.get_many, [preset_id for preset_id, _ in matches])
+    return FastJSONResponse(
+        {
+            "results": [
+                {"distance": round(distance, 4), "preset": presets[preset_id]}
+                for preset_id, distance in matches
+                if preset_id in presets
+            ]
+        }
+    )
 
 
 @app.post("/api/export")
-async def api_export(payload: ExportRequest) -> JSONResponse:
-    palette = palette_payload(payload)
-    fmt = payload.format.lower()
-    if fmt == "css":
-        return JSONResponse({"format": "css", "content": export_tokens_to_css(palette["palette"])})
-    if fmt == "tailwind":
-        return JSONResponse(
-            {"format": "tailwind", "content": export_tokens_to_tailwind(palette["palette"])}
-        )
-    if fmt == "figma":
-        return JSONResponse({"format": "figma", "content": export_tokens_to_figma(palette["palette"])})
-    return JSONResponse({"error": "Formato no soportado."}, status_code=400)
+async def api_export(payload: ExportRequest, request: Request) -> Response:
+    formats = list(dict.fromkeys(fmt.lower() for fmt in payload.formats or [payload.format]))
+    if not formats or unsupported_formats(formats):
+        return FastJSONResponse({"error": "Formato no soportado."}, status_code=400)
+
+    async def build() -> Union[Response, Tuple[Any, None]]:
+        if payload.preset_id is not None:
+            with metrics.stage("preset_load"):
+                preset = await asyncio.to_thread(preset_store.get, payload.preset_id)
+            if preset is None:
+                return FastJSONResponse({"error": "Preset no encontrado."}, status_code=404)
+            colors = preset["palette"]
+        else:
+            colors = (await cached_palette(payload))["palette"]
+        with metrics.stage("export"):
+            exports = export_palette(colors, formats)
+        if len(formats) > 1:
+            return StreamingResponse(
+                iter_zip(export_file(fmt, content) for fmt, content in exports.items()),
+                media_type="application/zip",
+                headers={"Content-Disposition": 'attachment; filename="palette-tokens.zip"'},
+            )
+        return {"format": formats[0], "content": exports[formats[0]]}, None
+
+    cacheable = len(formats) == 1 and (payload.seed is not None or payload.preset_id is not None)
+    return await respond(request, response_cache_key("export", payload, cacheable), build)
 
 
 @app.post("/api/ai-palettes")
-async def api_ai_palettes(payload: PaletteRequest) -> JSONResponse:
-    variations = generate_ai_variations(
-        payload.sentiment,
-        payload.idea,
-        payload.count,
-        payload.seed,
+async def api_ai_palettes(payload: PaletteRequest, request: Request) -> Response:
+    async def build() -> Tuple[Any, None]:
+        return {"palettes": await cached_variations(payload)}, None
+
+    key = response_cache_key("ai-palettes", payload, payload.seed is not None)
+    return await respond(request, key, build)
+
+
+@app.post("/api/bundle")
+async def api_bundle(payload: BundleRequest, request: Request) -> Response:
+    formats = [fmt.lower() for fmt in payload.formats]
+    if unsupported_formats(formats):
+        return FastJSONResponse({"error": "Formato no soportado."}, status_code=400)
+
+    async def build() -> Tuple[Any, Optional[Dict[str, Any]]]:
+        if not payload.variations:
+            palette, variations = await cached_palette(payload), []
+        else:
+            palette_key = palette_cache_key(payload)
+            variations_key = variations_cache_key(payload)
+            palette = palette_cache.get(palette_key) if palette_key else None
+            variations = palette_cache.get(variations_key) if variations_key else None
+            if palette is None or variations is None:
+                palette, variations = await run_generation(
+                    generate_palette_bundle,
+                    payload.sentiment,
+                    payload.idea,
+                    payload.count,
+                    payload.seed,
+                    payload.style,
+                    payload.brand,
+                    payload.contrast_matrix,
+                    payload.target_contrast,
+                    payload.simulate_cvd,
+                    payload.base_hues,
+                )
+                if palette_key and variations_key:
+                    palette_cache.set(palette_key, palette)
+                    palette_cache.set(variations_key, variations)
+            palette = personalize_palette(palette, payload.sentiment, payload.idea, payload.brand)
+            variations = personalize_variations(variations, payload)
+        with metrics.stage("export"):
+            exports = export_palette(palette["palette"], formats)
+        return {"palette": palette, "ai_palettes": variations, "exports": exports}, palette
+
+    key = response_cache_key("bundle", payload, payload.seed is not None)
+    return await respond(request, key, build)
+
+
+@app.post("/api/scale")
+async def api_scale(payload: ScaleRequest, request: Request) -> Response:
+    async def build() -> Tuple[Any, None]:
+        scale = await run_generation(
+            generate_scale,
+            payload.kind,
+            payload.steps,
+            payload.sentiment,
+            payload.idea,
+            payload.style,
+            payload.monotonic,
+            payload.base_hues,
+        )
+        return scale, None
+
+    # Scales take no seed: the same request always yields the same colors.
+    return await respond(request, response_cache_key("scale", payload, True), build)
+
+
+class RequestStreamingResponse(StreamingResponse):
+    """StreamingResponse for bodies generated while the request body is still being read.
+
+    The stock implementation listens for disconnects by calling ``receive`` in
+    a parallel task, which would swallow request body chunks. Here the body
+    iterator is the only reader and checks for disconnects itself (see
+    NDJSONBody); bodies read up front use the stock StreamingResponse.
+    """
+
+    async def __call__(self, scope: Any, receive: Any, send: Any) -> None:
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+
+class NDJSONBody:
+    """Request body read line by line while the response is streamed."""
+
+    def __init__(self, request: Request) -> None:
+        self.request = request
+        self.consumed = False
+        self.gone = False
+
+    async def lines(self) -> AsyncIterator[bytes]:
+        buffer = b""
+        while not self.consumed:
+            message = await self.request.receive()
+            if message["type"] == "http.disconnect":
+                self.gone = True
+                return
+            self.consumed = not message.get("more_body", False)
+            buffer += message.get("body", b"")
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                if line.strip():
+                    yield line
+        if buffer.strip():
+            yield buffer
+
+    async def disconnected(self) -> bool:
+        # Until the body is consumed a disconnect shows up in lines(); polling
+        # receive earlier would drop body chunks.
+        if not self.gone and self.consumed:
+            self.gone = await self.request.is_disconnected()
+        return self.gone
+
+
+async def iter_json_items(items: List[Any]) -> AsyncIterator[Any]:
+    for item in items:
+        yield item
+
+
+def parse_stream_request(item: Any) -> PaletteRequest:
+    if isinstance(item, bytes):
+        return PaletteRequest.model_validate_json(item)
+    return PaletteRequest.model_validate(item)
+
+
+def stream_chunk_specs(chunk: Iterable[PaletteRequest], variations: bool) -> List[PaletteSpec]:
+    specs = []
+    for item in chunk:
+        specs.append(request_spec(item))
+        if variations:
+            specs.extend(ai_variation_specs(item.sentiment, item.idea, item.count, item.seed))
+    return specs
+
+
+async def generate_stream_chunk(
+    chunk: List[Tuple[int, PaletteRequest]],
+    cost: float,
+    save: bool,
+    variations: bool,
+    client: str,
+) -> AsyncIterator[bytes]:
+    if not chunk:
+        return
+    specs = stream_chunk_specs((item for _index, item in chunk), variations)
+    # Held only while generating, not while a slow client reads the lines.
+    reserved = await admission.reserve(client, cost)
+    try:
+        palettes = await run_generation(generate_palettes_batch, specs)
+    finally:
+        admission.release(reserved)
+    step = 1 + len(AI_VARIATION_STYLES) if variations else 1
+    for position, (index, _item) in enumerate(chunk):
+        palette = palettes[position * step]
+        line: Dict[str, Any] = {"index": index, "palette": palette}
+        if variations:
+            line["ai_palettes"] = palettes[position * step + 1:(position + 1) * step]
+        if save:
+            await record_preset(palette)
+        yield serializers.dumps(line) + b"\n"
+
+
+async def stream_palettes(
+    items: AsyncIterator[Any],
+    save: bool,
+    variations: bool,
+    client: str,
+    disconnected: Optional[Callable[[], Awaitable[bool]]] = None,
+) -> AsyncIterator[bytes]:
+    """Generate palettes in small batches and yield one NDJSON line per input item.
+
+    Input is consumed incrementally and at most STREAM_CHUNK_SIZE requests
+    are held at once; the response body is only pulled as fast as the
+    client reads it, so memory stays flat for arbitrarily long inputs.
+    Chunks are also cut at STREAM_CHUNK_COST admission units and each one
+    is reserved with the admission controller before it is generated.
+    Generation stops before the next chunk once ``disconnected`` says the
+    client has gone: sends to a closed connection do not fail.
+    """
+    route = "/api/bundle" if variations else "/api/palette"
+    budget = min(STREAM_CHUNK_COST, admission.burst) if admission.rate > 0 else STREAM_CHUNK_COST
+    chunk: List[Tuple[int, PaletteRequest]] = []
+    chunk_cost = 0.0
+    index = 0
+    async for item in items:
+        error = None
+        cost = 0.0
+        try:
+            payload = parse_stream_request(item)
+        except (ValidationError, ValueError):
+            error = "Petición no válida."
+        else:
+            params = {"count": payload.count, "contrast_matrix": payload.contrast_matrix}
+            cost = estimate_cost(route, params)
+            if admission.too_costly(cost):
+                error = "Petición demasiado costosa, reduce count."
+        if error is not None or (chunk and chunk_cost + cost > budget):
+            if disconnected is not None and await disconnected():
+                return
+            async for line in generate_stream_chunk(chunk, chunk_cost, save, variations, client):
+                yield line
+            chunk, chunk_cost = [], 0.0
+        if error is not None:
+            yield serializers.dumps({"index": index, "error": error}) + b"\n"
+        else:
+            chunk.append((index, payload))
+            chunk_cost += cost
+        index += 1
+        if len(chunk) >= STREAM_CHUNK_SIZE:
+            if disconnected is not None and await disconnected():
+                return
+            async for line in generate_stream_chunk(chunk, chunk_cost, save, variations, client):
+                yield line
+            chunk, chunk_cost = [], 0.0
+    if disconnected is not None and await disconnected():
+        return
+    async for line in generate_stream_chunk(chunk, chunk_cost, save, variations, client):
+        yield line
+
+
+@app.post("/api/palettes/stream")
+async def api_palettes_stream(
+    request: Request, save: bool = True, variations: bool = False
+) -> Response:
+    client = client_key(request.scope, ADMISSION_CLIENT_HEADER)
+    if "ndjson" in request.headers.get("content-type", ""):
+        body = NDJSONBody(request)
+        return RequestStreamingResponse(
+            stream_palettes(body.lines(), save, variations, client, body.disconnected),
+            media_type="application/x-ndjson",
+        )
+    try:
+        items = await request.json()
+    except ValueError:
+        return FastJSONResponse({"error": "Cuerpo JSON no válido."}, status_code=400)
+    # The body is already read, so the stock listener can watch for disconnects.
+    return StreamingResponse(
+        stream_palettes(
+            iter_json_items(items if isinstance(items, list) else [items]), save, variations, client
+        ),
+        media_type="application/x-ndjson",
     )
-    return JSONResponse({"palettes": variations})
+
+
+async def apply_live_op(session: LiveSession, op: Any) -> Optional[Dict[str, Any]]:
+    """Apply one editor message; edits return None and are sent as a batched patch."""
+    if not isinstance(op, dict):
+        raise ValueError("Cada mensaje debe ser un objeto JSON.")
+    kind = op.get("type")
+    if kind == "edit":
+        session.edit(op.get("index"), op)
+        return None
+    if kind == "add":
+        session.add(op)
+    elif kind == "delete":
+        session.delete(op.get("index"))
+    elif kind == "load":
+        session.configure(op.get("formats"), op.get("contrast_matrix"))
+        session.load(op.get("palette"))
+    elif kind == "generate":
+        try:
+            payload = PaletteRequest.model_validate(op.get("request") or {})
+        except ValidationError:
+            raise ValueError("Petición no válida.") from None
+        # Checked before generating: WebSocket traffic bypasses admission control.
+        if payload.count > session.max_colors:
+            raise ValueError(f"Máximo {session.max_colors} colores por paleta.")
+        session.configure(op.get("formats"), payload.contrast_matrix)
+        palette = await cached_palette(payload)
+        session.load(palette["palette"])
+    elif kind == "options":
+        session.configure(op.get("formats"), op.get("contrast_matrix"))
+    else:
+        raise ValueError("Tipo de mensaje no soportado.")
+    return session.snapshot()
+
+
+async def run_live_ops(websocket: WebSocket, session: LiveSession, ops: List[Any]) -> None:
+    touched: List[int] = []
+    for op in coalesce_ops(ops):
+        try:
+            with metrics.stage("live_edit"):
+                reply = await apply_live_op(session, op)
+        except ValueError as exc:
+            reply = {"type": "error", "error": str(exc)}
+        if reply is None:
+            touched.append(op["index"])
+            continue
+        if touched:
+            # Flush pending color patches before anything that may renumber colors.
+            await websocket.send_text(serializers.dumps_text(session.patch(touched)))
+            touched = []
+        await websocket.send_text(serializers.dumps_text(reply))
+    if touched:
+        await websocket.send_text(serializers.dumps_text(session.patch(touched)))
+
+
+@app.websocket("/ws/editor")
+async def live_editor(websocket: WebSocket) -> None:
+    """Live color editor: the palette lives on the server and edits update it incrementally.
+
+    Messages that arrive within LIVE_EDIT_INTERVAL of the last reply are
+    applied together, with repeated edits of one color merged, so dragging a
+    slider costs at most one update per tick instead of one per input event.
+    """
+    await websocket.accept()
+    session = LiveSession(PALETTE_POOL_MAX_COUNT)
+    inbox: "asyncio.Queue[Optional[str]]" = asyncio.Queue(LIVE_EDIT_QUEUE_SIZE)
+
+    async def receive() -> None:
+        try:
+            while True:
+                await inbox.put(await websocket.receive_text())
+        except WebSocketDisconnect:
+            pass
+        finally:
+            await inbox.put(None)
+
+    reader = asyncio.create_task(receive())
+    loop = asyncio.get_running_loop()
+    last_reply = 0.0
+    try:
+        while True:
+            messages = [await inbox.get()]
+            delay = last_reply + LIVE_EDIT_INTERVAL - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            while not inbox.empty():
+                messages.append(inbox.get_nowait())
+            ops = []
+            for message in messages:
+                if message is None:
+                    continue
+                try:
+                    ops.append(serializers.loads(message))
+                except ValueError:
+                    ops.append(message)
+            await run_live_ops(websocket, session, ops)
+            last_reply = loop.time()
+            if None in messages:
+                return
+    except WebSocketDisconnect:
+        pass
+    finally:
+        reader.cancel()
@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""Reproducible benchmarks for palette_core and the FastAPI endpoints.
+
+Results are written as JSON (min/median/p95 microseconds per operation).
+Every sample is followed by one run of a fixed pure-Python reference
+workload, and each benchmark's best time is stored as a ratio to the
+reference's best time over the same stretch of the run. A baseline saved
+locally with --save-baseline is compared on those ratios, so a slower or
+busier machine does not read as a regression; any benchmark whose ratio
+grows by more than the tolerance makes the run exit with status 1. The
+best time is used because it is far less sensitive to scheduler noise
+than the median.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+PALETTE_COUNTS = (5, 16, 64, 256, 1024)
+PRESET_SIZES = (100, 1000, 10000)
+
+
+def reference_workload() -> float:
+    """Fixed work that depends on nothing in this repository.
+
+    It leans on the same primitives as the palette code (seeded random draws,
+    gamma powers, small dicts and strings), so it slows down along with it
+    when the interpreter or the machine does.
+    """
+    rng = random.Random(42)
+    total = 0.0
+    for index in range(200):
+        channel = rng.random()
+        row = {"hex": f"#{index:06X}", "light": ((channel + 0.055) / 1.055) ** 2.4}
+        total += row["light"] + rng.uniform(0, 360) % 7 + len(row["hex"])
+    return total
+
+
+def time_reference() -> float:
+    start = time.perf_counter()
+    reference_workload()
+    return time.perf_counter() - start
+
+
+def summarize(samples: List[float], reference: List[float]) -> Dict[str, float]:
+    ordered = sorted(samples)
+    return {
+        "min_us": round(ordered[0] * 1e6, 3),
+        "median_us": round(statistics.median(ordered) * 1e6, 3),
+        "p95_us": round(ordered[int(0.95 * (len(ordered) - 1))] * 1e6, 3),
+        "ratio": round(ordered[0] / min(reference), 4),
+        "runs": len(ordered),
+    }
+
+
+def time_call(function: Callable[[], Any], runs: int, inner: int = 1) -> Dict[str, float]:
+    function()
+    reference_workload()
+    samples, reference = [], []
+    for _ in range(runs):
+        start = time.perf_counter()
+        for _ in range(inner):
+            function()
+        samples.append((time.perf_counter() - start) / inner)
+        reference.append(time_reference())
+    return summarize(samples, reference)
+
+
+async def time_async_call(function: Callable[[], Awaitable[Any]], runs: int) -> Dict[str, float]:
+    await function()
+    reference_workload()
+    samples, reference = [], []
+    for _ in range(runs):
+        start = time.perf_counter()
+        await function()
+        samples.append(time.perf_counter() - start)
+        reference.append(time_reference())
+    return summarize(samples, reference)
+
+
+def bench_core(runs: int) -> Dict[str, Dict[str, float]]:
+    from palette_core import (
+        configure_conversion_cache,
+        contrast_ratio,
+        generate_ai_variations,
+        generate_palette,
+        hsl_to_rgb,
+        relative_luminance,
+        rgb_to_hsl,
+    )
+
+    # Measure the raw algorithms, not warm memo hits.
+    configure_conversion_cache(0)
+    results = {
+        "core.hsl_to_rgb": time_call(lambda: hsl_to_rgb(205, 55, 45), runs, inner=1000),
+        "core.rgb_to_hsl": time_call(lambda: rgb_to_hsl(52, 120, 178), runs, inner=1000),
+        "core.relative_luminance": time_call(
+            lambda: relative_luminance(52, 120, 178), runs, inner=1000
+        ),
+        "core.contrast_ratio": time_call(
+            lambda: contrast_ratio((52, 120, 178), (248, 250, 252)), runs, inner=1000
+        ),
+    }
+    for count in PALETTE_COUNTS:
+        results[f"core.generate_palette[count={count}]"] = time_call(
+            lambda count=count: generate_palette("calma", "bench", count, 42, "retro", None),
+            max(5, runs // max(1, count // 16)),
+        )
+    results["core.generate_ai_variations"] = time_call(
+        lambda: generate_ai_variations("energia", "bench", 5, 42), runs
+    )
+    configure_conversion_cache(int(os.environ.get("PALETTE_CONVERSION_CACHE_SIZE", "65536")))
+    return results
+
+
+def make_preset_entry(index: int) -> Dict[str, Any]:
+    from palette_core import generate_palette
+
+    palette = generate_palette("calma", "bench", 5, index, None, f"brand-{index % 50}")
+    return {
+        "created_at": datetime(2026, 1, 1, tzinfo=timezone.utc).isoformat(),
+        "sentiment": palette["sentiment"],
+        "idea": palette["idea"],
+        "style": palette["style"],
+        "brand_hint": palette["brand_hint"],
+        "palette": palette["palette"],
+    }
+
+
+async def bench_api(runs: int, workdir: str) -> Dict[str, Dict[str, float]]:
+    import httpx
+
+    import app as web_app
+    from preset_store import PresetStore
+
+    results: Dict[str, Dict[str, float]] = {}
+    transport = httpx.ASGITransport(app=web_app.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        seed_counter = iter(range(10**9))
+
+        async def post_palette() -> None:
+            response = await client.post(
+                "/api/palette", json={"sentiment": "calma", "count": 5, "seed": next(seed_counter)}
+            )
+            response.raise_for_status()
+
+        async def post_export() -> None:
+            response = await client.post(
+                "/api/export",
+                json={"sentiment": "calma", "count": 5, "seed": next(seed_counter), "format": "figma"},
+            )
+            response.raise_for_status()
+
+        results["api.palette"] = await time_async_call(post_palette, runs)
+        results["api.export"] = await time_async_call(post_export, runs)
+
+        original_store = web_app.preset_store
+        try:
+            entries = [make_preset_entry(index) for index in range(max(PRESET_SIZES))]
+            for size in PRESET_SIZES:
+                store = PresetStore(f"sqlite:///{os.path.join(workdir, f'presets-{size}.db')}")
+                store.append_many(entries[:size])
+                web_app.preset_store = store
+
+                async def list_presets() -> None:
+                    response = await client.get("/api/presets", params={"limit": 50})
+                    response.raise_for_status()
+
+                async def list_brand() -> None:
+                    response = await client.get(
+                        "/api/presets", params={"limit": 50, "brand_hint": "brand-7"}
+                    )
+                    response.raise_for_status()
+
+                results[f"api.presets[size={size}]"] = await time_async_call(list_presets, runs)
+                results[f"api.presets_brand[size={size}]"] = await time_async_call(list_brand, runs)
+        finally:
+            web_app.preset_store = original_store
+    return results
+
+
+def compare(
+    results: Dict[str, Dict[str, float]],
+    baseline: Dict[str, Dict[str, float]],
+    tolerance: float,
+) -> List[str]:
+    regressions = []
+    for name, current in sorted(results.items()):
+        saved = baseline.get(name)
+        if not saved:
+            continue
+        if "ratio" not in saved:
+            raise ValueError("La baseline no tiene ratios: regénerala con --save-baseline.")
+        limit = saved["ratio"] * (1 + tolerance)
+        if current["ratio"] > limit:
+            regressions.append(
+                f"{name}: {current['ratio']:.2f}x > {saved['ratio']:.2f}x the reference "
+                f"(+{tolerance:.0%} tolerance)"
+            )
+    return regressions
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Benchmarks de palette_core y de la API.")
+    parser.add_argument("--runs", type=int, default=50, help="Repeticiones por benchmark.")
+    parser.add_argument(
+        "--suite", choices=("all", "core", "api"), default="all", help="Grupo de benchmarks."
+    )
+    parser.add_argument("--output", type=str, default="-", help="Fichero JSON de resultados.")
+    parser.add_argument(
+        "--baseline",
+        type=str,
+        default=DEFAULT_BASELINE,
+        help="Baseline local (generada con --save-baseline) con la que comparar.",
+    )
+    parser.add_argument(
+        "--tolerance", type=float, default=0.25, help="Empeoramiento máximo permitido (0.25 = 25%%)."
+    )
+    parser.add_argument(
+        "--save-baseline", action="store_true", help="Guarda los resultados como nueva baseline."
+    )
+    return parser
+
+
+def main() -> None:
+    args = build_parser().parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        # The web app is imported lazily so that it writes to a scratch database.
+        os.environ.setdefault("PRESETS_DB_URL", f"sqlite:///{os.path.join(workdir, 'presets.db')}")
+        # A single client hammering each endpoint would be rate limited and shed.
+        os.environ["ADMISSION_RATE"] = "0"
+        os.environ["ADMISSION_CAPACITY"] = "0"
+        results: Dict[str, Dict[str, float]] = {}
+        if args.suite in ("all", "core"):
+            results.update(bench_core(args.runs))
+        if args.suite in ("all", "api"):
+            results.update(asyncio.run(bench_api(args.runs, workdir)))
+
+    report = json.dumps(results, indent=2, sort_keys=True)
+    if args.output == "-":
+        print(report)
+    else:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(report + "\n")
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as file:
+            file.write(report + "\n")
+        return
+    if not os.path.exists(args.baseline):
+        print("Sin baseline: genérala en esta máquina con --save-baseline.", file=sys.stderr)
+        return
+    with open(args.baseline, "r", encoding="utf-8") as file:
+        baseline = json.load(file)
+    try:
+        regressions = compare(results, baseline, args.tolerance)
+    except ValueError as exc:
+        print(str(exc), file=sys.stderr)
+        sys.exit(1)
+    if regressions:
+        print("Regresiones de rendimiento detectadas:", file=sys.stderr)
+        for line in regressions:
+            print(f"  {line}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""Dominant brand colors from logo images (median cut over a downscaled sample).
+
+Decoding uses Pillow (``pip install Pillow``). JPEG logos are decoded
+directly at a reduced scale; other formats are decoded at full size and
+shrunk right after, so they get a much smaller pixel cap. Only a small
+pixel buffer (at most ``sample_side`` squared) is kept.
+"""
+from __future__ import annotations
+
+import hashlib
+import io
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from palette_cache import LocalTTLCache
+from palette_core import rgb_to_hsl_array
+
+try:
+    from PIL import Image
+except ImportError:  # pragma: no cover - optional dependency
+    Image = None
+
+LOGO_SAMPLE_SIDE = 96
+# Larger images are rejected before decoding (decompression bombs). JPEG is
+# decoded at 1/8 scale at most; every other format is decoded at full size.
+LOGO_MAX_PIXELS = 40_000_000
+LOGO_MAX_FULL_PIXELS = 4_000_000
+QUANT_BITS = 5
+# Colors below this saturation, or this close to black/white, are treated as
+# background/ink and do not seed hues.
+MIN_HUE_SATURATION = 20
+HUE_LIGHTNESS_RANGE = (10, 92)
+MIN_HUE_DISTANCE = 12
+
+
+class LogoTooLarge(ValueError):
+    """The logo has more pixels than its format may be decoded with."""
+
+
+def decode_logo(data: bytes, sample_side: int = LOGO_SAMPLE_SIDE) -> np.ndarray:
+    """Opaque pixels of a downscaled logo as an (n, 3) uint8 array."""
+    if Image is None:
+        raise RuntimeError("Instala Pillow (pip install Pillow) para extraer colores de logos.")
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            limit = LOGO_MAX_PIXELS if image.format == "JPEG" else LOGO_MAX_FULL_PIXELS
+            if image.width * image.height > limit:
+                raise LogoTooLarge(f"La imagen supera el máximo de {limit // 1_000_000} megapíxeles.")
+            image.draft("RGB", (sample_side, sample_side))
+            image.thumbnail((sample_side, sample_side), reducing_gap=2.0)
+            rgba = np.asarray(image.convert("RGBA"))
+    except (OSError, SyntaxError, Image.DecompressionBombError):
+        raise ValueError("Imagen no válida.") from None
+    pixels = rgba.reshape(-1, 4)
+    opaque = pixels[pixels[:, 3] >= 128, :3]
+    if not len(opaque):
+        raise ValueError("El logo no tiene píxeles opacos.")
+    return opaque
+
+
+def median_cut(pixels: np.ndarray, count: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Median-cut quantization of (n, 3) pixels into at most ``count`` colors.
+
+    Pixels are first binned to QUANT_BITS per channel, so boxes are split
+    over the (weighted) distinct bins rather than every pixel. The box with
+    the largest weighted variance is split along its widest channel at the
+    cut that maximizes the between-box variance (a weighted median that does
+    not cut through the middle of a cluster). Returns the mean color of each
+    box and its pixel count, most frequent first.
+    """
+    shift = 8 - QUANT_BITS
+    bins = pixels.astype(np.int64) >> shift
+    keys = (bins[:, 0] << (2 * QUANT_BITS)) | (bins[:, 1] << QUANT_BITS) | bins[:, 2]
+    _keys, inverse, weights = np.unique(keys, return_inverse=True, return_counts=True)
+    sums = np.stack(
+        [
+            np.bincount(inverse, weights=pixels[:, channel], minlength=len(weights))
+            for channel in range(3)
+        ],
+        axis=1,
+    )
+    colors = sums / weights[:, None]
+
+    def spread(box: np.ndarray) -> float:
+        mean = sums[box].sum(axis=0) / weights[box].sum()
+        return float((weights[box] * ((colors[box] - mean) ** 2).sum(axis=1)).sum())
+
+    boxes = [np.arange(len(weights))]
+    spreads = [spread(boxes[0])]
+    while len(boxes) < count:
+        target = int(np.argmax(spreads))
+        if spreads[target] <= 0:
+            break
+        box = boxes.pop(target)
+        spreads.pop(target)
+        channel = int(np.argmax(np.ptp(colors[box], axis=0)))
+        ordered = box[np.argsort(colors[box, channel], kind="stable")]
+        values = colors[ordered, channel]
+        left_weight = np.cumsum(weights[ordered])[:-1]
+        left_sum = np.cumsum(weights[ordered] * values)[:-1]
+        right_weight = left_weight[-1] + weights[ordered[-1]] - left_weight
+        right_sum = left_sum[-1] + weights[ordered[-1]] * values[-1] - left_sum
+        between = left_weight * right_weight * (left_sum / left_weight - right_sum / right_weight) ** 2
+        cut = int(np.argmax(between)) + 1
+        for part in (ordered[:cut], ordered[cut:]):
+            boxes.append(part)
+            spreads.append(spread(part))
+
+    totals = np.array([weights[box].sum() for box in boxes])
+    means = np.array([sums[box].sum(axis=0) for box in boxes]) / totals[:, None]
+    order = np.argsort(-totals, kind="stable")
+    return np.rint(means[order]).astype(np.int64), totals[order]
+
+
+def dominant_hues(hsl: np.ndarray) -> List[int]:
+    """Hues of the chromatic colors (already sorted by share), skipping near-duplicates."""
+    hues: List[int] = []
+    for hue, saturation, lightness in hsl.tolist():
+        if saturation < MIN_HUE_SATURATION:
+            continue
+        if not HUE_LIGHTNESS_RANGE[0] <= lightness <= HUE_LIGHTNESS_RANGE[1]:
+            continue
+        hue %= 360
+        if all(min(abs(hue - other), 360 - abs(hue - other)) >= MIN_HUE_DISTANCE for other in hues):
+            hues.append(hue)
+    return hues
+
+
+def extract_brand_colors(
+    data: bytes, count: int = 5, sample_side: int = LOGO_SAMPLE_SIDE
+) -> Dict[str, Any]:
+    """Dominant colors of a logo plus the hues to seed a palette profile with.
+
+    ``base_hues`` is empty for monochrome logos; callers then keep the
+    profile's own hues.
+    """
+    pixels = decode_logo(data, sample_side)
+    colors, totals = median_cut(pixels, count)
+    hsl = rgb_to_hsl_array(colors)
+    shares = totals / totals.sum()
+    return {
+        "hash": hashlib.sha256(data).hexdigest(),
+        "colors": [
+            {
+                "hex": "#{:02X}{:02X}{:02X}".format(*rgb),
+                "rgb": rgb,
+                "hue": h,
+                "saturation": s,
+                "lightness": l,
+                "share": round(share, 4),
+            }
+            for rgb, (h, s, l), share in zip(colors.tolist(), hsl.tolist(), shares.tolist())
+        ],
+        "base_hues": dominant_hues(hsl),
+    }
+
+
+class BrandColorExtractor:
+    """extract_brand_colors behind a bounded LRU cache keyed by the image's SHA-256."""
+
+    def __init__(self, cache_size: int = 1024, ttl: float = 3600.0) -> None:
+        self.cache = LocalTTLCache(cache_size, ttl)
+
+    @staticmethod
+    def cache_key(data: bytes, count: int) -> str:
+        return f"{hashlib.sha256(data).hexdigest()}:{count}"
+
+    def get(self, data: bytes, count: int) -> Optional[Dict[str, Any]]:
+        return self.cache.get(self.cache_key(data, count))
+
+    def set(self, data: bytes, count: int, result: Dict[str, Any]) -> None:
+        self.cache.set(self.cache_key(data, count), result)
+
+    def extract(self, data: bytes, count: int = 5) -> Dict[str, Any]:
+        result = self.get(data, count)
+        if result is None:
+            result = extract_brand_colors(data, count)
+            self.set(data, count, result)
+        return result
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""Design-token export engine: one token set per palette, many output formats."""
+from __future__ import annotations
+
+import io
+import json
+import zipfile
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Tuple
+
+import numpy as np
+
+from palette_core import best_text_color, cached_hsl_to_rgb, hsl_to_rgb_array, parse_hex
+
+SCALE_STEPS = (50, 100, 200, 300, 400, 500, 600, 700, 800, 900, 950)
+# Fraction of the way from the base lightness towards white (lighter steps)
+# or towards near-black (darker steps); the palette color itself is 500.
+SCALE_MIX = {
+    50: 0.95, 100: 0.88, 200: 0.74, 300: 0.56, 400: 0.3, 500: 0.0,
+    600: -0.18, 700: -0.36, 800: -0.54, 900: -0.7, 950: -0.82,
+}
+SCALE_LIGHTEST = 98
+SCALE_DARKEST = 6
+
+
+@dataclass(frozen=True)
+class ColorToken:
+    name: str
+    hex: str
+    rgba: str
+    hsl: str
+    text: str
+    hue: int
+    saturation: int
+    lightness: int
+
+
+@dataclass
+class TokenSet:
+    """Tokens for one palette; the 50-950 scale is computed on first use."""
+
+    colors: List[ColorToken]
+    _scale: Dict[str, Dict[str, str]] | None = field(default=None, repr=False)
+
+    def hex_tokens(self) -> Dict[str, str]:
+        return {color.name: color.hex for color in self.colors}
+
+    @property
+    def scale(self) -> Dict[str, Dict[str, str]]:
+        if self._scale is None:
+            self._scale = build_scale(self.colors)
+        return self._scale
+
+
+def color_token(index: int, color: Dict[str, Any]) -> ColorToken:
+    """Token for the color at 1-based position ``index``."""
+    formats = color.get("formats", {})
+    if not isinstance(formats, dict):
+        formats = {}
+    hex_value = formats.get("hex", "")
+    hue = int(color.get("hue", 0))
+    saturation = int(color.get("saturation", 0))
+    lightness = int(color.get("lightness", 0))
+    text = color.get("text")
+    if not text:
+        # Legacy presets were saved without a text color; pick it as palette_core does.
+        try:
+            rgb = parse_hex(hex_value)
+        except ValueError:
+            rgb = cached_hsl_to_rgb(hue, saturation, lightness)
+        text = best_text_color(rgb)
+    return ColorToken(
+        name=f"palette-{index}",
+        hex=hex_value,
+        rgba=formats.get("rgba", ""),
+        hsl=formats.get("hsl", ""),
+        text=text,
+        hue=hue,
+        saturation=saturation,
+        lightness=lightness,
+    )
+
+
+def build_token_set(palette: List[Dict[str, Any]]) -> TokenSet:
+    return TokenSet([color_token(index, color) for index, color in enumerate(palette, start=1)])
+
+
+def build_scale(colors: List[ColorToken]) -> Dict[str, Dict[str, str]]:
+    """Tailwind-style 50-950 ramps keeping each color's hue and saturation."""
+    if not colors:
+        return {}
+    base = np.array([color.lightness for color in colors], dtype=np.float64)[:, None]
+    mix = np.array([SCALE_MIX[step] for step in SCALE_STEPS], dtype=np.float64)[None, :]
+    lightness = np.where(
+        mix >= 0,
+        base + (SCALE_LIGHTEST - base) * mix,
+        base + (base - SCALE_DARKEST) * mix,
+    )
+    hues = np.repeat([color.hue for color in colors], len(SCALE_STEPS))
+    saturations = np.repeat([color.saturation for color in colors], len(SCALE_STEPS))
+    rgb = hsl_to_rgb_array(hues, saturations, np.rint(lightness).ravel())
+    rgb = rgb.reshape(len(colors), len(SCALE_STEPS), 3)
+    scale = {}
+    for color, ramp in zip(colors, rgb):
+        steps = {
+            str(step): "#{:02X}{:02X}{:02X}".format(*values)
+            for step, values in zip(SCALE_STEPS, ramp)
+        }
+        steps["500"] = color.hex or steps["500"]
+        scale[color.name] = steps
+    return scale
+
+
+def to_css(tokens: TokenSet) -> str:
+    lines = [":root {"]
+    for key, value in tokens.hex_tokens().items():
+        lines.append(f"  --{key}: {value};")
+    lines.append("}")
+    return "\n".join(lines)
+
+
+def to_tailwind(tokens: TokenSet) -> Dict[str, Any]:
+    return {"theme": {"extend": {"colors": tokens.hex_tokens()}}}
+
+
+def to_figma(tokens: TokenSet) -> Dict[str, Any]:
+    return {
+        "colors": {
+            name: {"value": value, "type": "color"} for name, value in tokens.hex_tokens().items()
+        }
+    }
+
+
+def to_style_dictionary(tokens: TokenSet) -> Dict[str, Any]:
+    return {
+        "color": {
+            "palette": {
+                str(index): {
+                    "value": color.hex,
+                    "type": "color",
+                    "attributes": {"rgba": color.rgba, "hsl": color.hsl},
+                    "text": {"value": color.text, "type": "color"},
+                }
+                for index, color in enumerate(tokens.colors, start=1)
+            }
+        }
+    }
+
+
+def to_scss(tokens: TokenSet) -> str:
+    lines = []
+    for color in tokens.colors:
+        lines.append(f"${color.name}: {color.hex};")
+        lines.append(f"${color.name}-rgba: {color.rgba};")
+        lines.append(f"${color.name}-text: {color.text};")
+    lines.append("")
+    lines.append("$palette: (")
+    lines.extend(f'  "{color.name}": ${color.name},' for color in tokens.colors)
+    lines.append(");")
+    return "\n".join(lines)
+
+
+def to_css_in_js(tokens: TokenSet) -> str:
+    colors = {
+        color.name: {"hex": color.hex, "rgba": color.rgba, "hsl": color.hsl, "text": color.text}
+        for color in tokens.colors
+    }
+    body = json.dumps(colors, ensure_ascii=False, indent=2)
+    return f"export const palette = {body};\n\nexport default palette;"
+
+
+def to_scale(tokens: TokenSet) -> Dict[str, Dict[str, str]]:
+    return tokens.scale
+
+
+Exporter = Callable[[TokenSet], Any]
+
+EXPORT_FORMATS: Dict[str, Exporter] = {
+    "css": to_css,
+    "tailwind": to_tailwind,
+    "figma": to_figma,
+    "style-dictionary": to_style_dictionary,
+    "scss": to_scss,
+    "css-in-js": to_css_in_js,
+    "scale": to_scale,
+}
+
+EXPORT_FILENAMES = {
+    "css": "palette.css",
+    "tailwind": "tailwind.colors.json",
+    "figma": "figma.tokens.json",
+    "style-dictionary": "style-dictionary.tokens.json",
+    "scss": "_palette.scss",
+    "css-in-js": "palette.js",
+    "scale": "palette.scale.json",
+}
+
+
+def unsupported_formats(formats: Iterable[str]) -> List[str]:
+    return [fmt for fmt in formats if fmt not in EXPORT_FORMATS]
+
+
+def export_palette(palette: List[Dict[str, Any]], formats: Iterable[str]) -> Dict[str, Any]:
+    """Build the token set once and render every requested format from it."""
+    tokens = build_token_set(palette)
+    return {fmt: EXPORT_FORMATS[fmt](tokens) for fmt in formats}
+
+
+def export_file(fmt: str, content: Any) -> Tuple[str, bytes]:
+    if not isinstance(content, str):
+        content = json.dumps(content, ensure_ascii=False, indent=2)
+    return EXPORT_FILENAMES[fmt], (content + "\n").encode("utf-8")
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only, non-seekable file collecting bytes until they are drained."""
+
+    def __init__(self) -> None:
+        self._chunks: List[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data: Any) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def iter_zip(files: Iterable[Tuple[str, bytes]]) -> Iterator[bytes]:
+    """Yield a zip archive piece by piece, one member at a time."""
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, data in files:
+            archive.writestr(name, data)
+            chunk = sink.drain()
+            if chunk:
+                yield chunk
+    chunk = sink.drain()
+    if chunk:
+        yield chunk
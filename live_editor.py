@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""Server-side palette state for the live color editor (WebSocket sessions)."""
+from __future__ import annotations
+
+from bisect import bisect_left, insort
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from export_engine import EXPORT_FORMATS, TokenSet, color_token, unsupported_formats
+from palette_core import (
+    DARK_TEXT,
+    LIGHT_TEXT,
+    contrast_matrix,
+    contrast_note,
+    format_color,
+    hsl_to_rgb,
+    parse_hex,
+    relative_luminance,
+    rgb_to_hsl,
+)
+
+HSL_FIELDS = ("hue", "saturation", "lightness")
+HSL_LIMITS = {"hue": 360, "saturation": 100, "lightness": 100}
+
+
+def _pair_ratio(darker: float, lighter: float) -> float:
+    return (lighter + 0.05) / (darker + 0.05)
+
+
+def _alpha_of(color: Dict[str, Any]) -> float:
+    formats = color.get("formats")
+    try:
+        return float(formats["rgba"].rsplit(",", 1)[1].rstrip(") "))
+    except (KeyError, IndexError, TypeError, ValueError, AttributeError):
+        return 1.0
+
+
+def coalesce_ops(ops: Iterable[Any]) -> List[Any]:
+    """Merge runs of edits so each color is updated once per tick.
+
+    Edits to the same index between two structural operations (load, add,
+    delete...) are folded into one. A ``hex`` drops earlier HSL fields and
+    later HSL fields apply on top of it, so the merged edit ends in the
+    same state as applying every message in order.
+    """
+    merged: List[Any] = []
+    pending: Dict[int, Dict[str, Any]] = {}
+    for op in ops:
+        index = op.get("index") if isinstance(op, dict) else None
+        if index is None or op.get("type") != "edit" or not isinstance(index, int):
+            merged.extend(pending.values())
+            pending = {}
+            merged.append(op)
+            continue
+        current = pending.setdefault(index, {"type": "edit", "index": index})
+        if "hex" in op:
+            for field in HSL_FIELDS:
+                current.pop(field, None)
+        current.update(op)
+    merged.extend(pending.values())
+    return merged
+
+
+class LiveSession:
+    """One editor's palette with incrementally maintained metrics.
+
+    Luminances are cached per color and kept in a sorted list, so a single
+    color edit costs O(n): one bisect removal/insertion plus a scan of
+    luminance neighbours for the minimum contrast (the same neighbour
+    argument as ``min_contrast_pair``), one row and column of the optional
+    contrast matrix, and one export token. Nothing reruns the full
+    ``generate_palette`` pass.
+    """
+
+    def __init__(self, max_colors: int = 32) -> None:
+        self.max_colors = max_colors
+        self.formats: List[str] = ["css"]
+        self.full_contrast_matrix = False
+        self.version = 0
+        self.colors: List[Dict[str, Any]] = []
+        self.alphas: List[float] = []
+        self.luminances: List[float] = []
+        self.tokens: List[Any] = []
+        self.matrix: Optional[List[List[float]]] = None
+        self._order: List[Tuple[float, int]] = []
+
+    def configure(
+        self, formats: Optional[Sequence[str]] = None, full_contrast_matrix: Any = None
+    ) -> None:
+        if formats is not None:
+            if isinstance(formats, str) or not isinstance(formats, (list, tuple)):
+                raise ValueError("formats debe ser una lista.")
+            formats = [str(fmt).lower() for fmt in formats]
+            if unsupported_formats(formats):
+                raise ValueError("Formato no soportado.")
+            self.formats = formats
+        if full_contrast_matrix is not None:
+            self.full_contrast_matrix = bool(full_contrast_matrix)
+            self.matrix = contrast_matrix(self.luminances) if self.full_contrast_matrix else None
+
+    def load(self, palette: Sequence[Dict[str, Any]]) -> None:
+        if not isinstance(palette, (list, tuple)) or not palette:
+            raise ValueError("La paleta debe ser una lista de colores no vacía.")
+        if len(palette) > self.max_colors:
+            raise ValueError(f"Máximo {self.max_colors} colores por paleta.")
+        colors = []
+        alphas = []
+        for color in palette:
+            if not isinstance(color, dict):
+                raise ValueError("Cada color debe ser un objeto.")
+            alpha = _alpha_of(color)
+            # Prefer the HSL fields: they reproduce generated colors exactly.
+            changes = {field: color.get(field) for field in HSL_FIELDS}
+            formats = color.get("formats")
+            if None in changes.values() and isinstance(formats, dict):
+                changes = {"hex": formats.get("hex")}
+            colors.append(self._build_color(len(colors), changes, alpha, None))
+            alphas.append(alpha)
+        self.colors = colors
+        self.alphas = alphas
+        self.luminances = [self._luminance(color) for color in colors]
+        self._order = sorted((luminance, index) for index, luminance in enumerate(self.luminances))
+        self.tokens = [color_token(index + 1, color) for index, color in enumerate(colors)]
+        self.matrix = contrast_matrix(self.luminances) if self.full_contrast_matrix else None
+        self.version += 1
+
+    def edit(self, index: Any, changes: Dict[str, Any]) -> None:
+        index = self._check_index(index)
+        alpha = self._parse_alpha(changes.get("alpha"), self.alphas[index])
+        color = self._build_color(index, changes, alpha, self.colors[index])
+        self._replace(index, color, alpha)
+        self.version += 1
+
+    def add(self, changes: Dict[str, Any]) -> int:
+        if len(self.colors) >= self.max_colors:
+            raise ValueError(f"Máximo {self.max_colors} colores por paleta.")
+        index = len(self.colors)
+        alpha = self._parse_alpha(changes.get("alpha"), 0.85)
+        color = self._build_color(index, changes, alpha, None)
+        luminance = self._luminance(color)
+        self.colors.append(color)
+        self.alphas.append(alpha)
+        self.luminances.append(luminance)
+        insort(self._order, (luminance, index))
+        self.tokens.append(color_token(index + 1, color))
+        if self.matrix is not None:
+            row = [round(_pair_ratio(*sorted((luminance, other))), 2) for other in self.luminances]
+            for existing, ratio in zip(self.matrix, row):
+                existing.append(ratio)
+            self.matrix.append(row)
+        self.version += 1
+        return index
+
+    def delete(self, index: Any) -> None:
+        index = self._check_index(index)
+        if len(self.colors) <= 1:
+            raise ValueError("La paleta debe conservar al menos un color.")
+        luminance = self.luminances[index]
+        del self._order[bisect_left(self._order, (luminance, index))]
+        self._order = [(value, row - 1 if row > index else row) for value, row in self._order]
+        del self.colors[index]
+        del self.alphas[index]
+        del self.luminances[index]
+        del self.tokens[index]
+        # Names and token names are positional; renumber the colors that moved.
+        for position in range(index, len(self.colors)):
+            self.colors[position]["name"] = f"Color {position + 1}"
+            self.tokens[position] = color_token(position + 1, self.colors[position])
+        if self.matrix is not None:
+            del self.matrix[index]
+            for row in self.matrix:
+                del row[index]
+        self.version += 1
+
+    def contrast(self) -> Dict[str, Any]:
+        min_ratio = 0.0
+        min_pair = None
+        for (darker, first), (lighter, second) in zip(self._order, self._order[1:]):
+            ratio = _pair_ratio(darker, lighter)
+            if min_pair is None or ratio < min_ratio:
+                min_ratio = ratio
+                min_pair = [min(first, second), max(first, second)]
+        contrast: Dict[str, Any] = {
+            "min_ratio": round(min_ratio, 2),
+            "note": contrast_note(min_ratio),
+            "pair": min_pair,
+        }
+        if self.matrix is not None:
+            contrast["matrix"] = self.matrix
+        return contrast
+
+    def exports(self) -> Dict[str, Any]:
+        tokens = TokenSet(list(self.tokens))
+        return {fmt: EXPORT_FORMATS[fmt](tokens) for fmt in self.formats}
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "type": "state",
+            "version": self.version,
+            "palette": self.colors,
+            "contrast": self.contrast(),
+            "exports": self.exports(),
+        }
+
+    def patch(self, indexes: Iterable[int]) -> Dict[str, Any]:
+        return {
+            "type": "update",
+            "version": self.version,
+            "colors": {str(index): self.colors[index] for index in sorted(set(indexes))},
+            "contrast": self.contrast(),
+            "exports": self.exports(),
+        }
+
+    def _replace(self, index: int, color: Dict[str, Any], alpha: float) -> None:
+        old = self.luminances[index]
+        luminance = self._luminance(color)
+        del self._order[bisect_left(self._order, (old, index))]
+        insort(self._order, (luminance, index))
+        self.colors[index] = color
+        self.alphas[index] = alpha
+        self.luminances[index] = luminance
+        self.tokens[index] = color_token(index + 1, color)
+        if self.matrix is not None:
+            for other, other_luminance in enumerate(self.luminances):
+                ratio = round(_pair_ratio(*sorted((luminance, other_luminance))), 2)
+                self.matrix[index][other] = ratio
+                self.matrix[other][index] = ratio
+
+    def _check_index(self, index: Any) -> int:
+        if not isinstance(index, int) or isinstance(index, bool) or not 0 <= index < len(self.colors):
+            raise ValueError("Índice de color no válido.")
+        return index
+
+    @staticmethod
+    def _parse_alpha(value: Any, default: float) -> float:
+        if value is None:
+            return default
+        try:
+            alpha = round(float(value), 2)
+        except (TypeError, ValueError):
+            raise ValueError("alpha debe ser un número entre 0 y 1.") from None
+        if not 0 <= alpha <= 1:
+            raise ValueError("alpha debe ser un número entre 0 y 1.")
+        return alpha
+
+    @staticmethod
+    def _luminance(color: Dict[str, Any]) -> float:
+        return relative_luminance(*parse_hex(color["formats"]["hex"]))
+
+    @staticmethod
+    def _build_color(
+        index: int, changes: Dict[str, Any], alpha: float, base: Optional[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """Color dict in the generate_palette shape.
+
+        ``hex`` is applied first and any HSL fields on top of it; missing
+        fields come from ``base``.
+        """
+        has_hsl = any(changes.get(field) is not None for field in HSL_FIELDS)
+        rgb = None
+        if changes.get("hex") is not None:
+            if not isinstance(changes["hex"], str):
+                raise ValueError("hex debe ser un color hexadecimal.")
+            rgb = parse_hex(changes["hex"])
+            base = dict(zip(HSL_FIELDS, rgb_to_hsl(*rgb)))
+        elif base is not None and not has_hsl:
+            # Alpha-only edits keep the exact RGB of the current color.
+            rgb = parse_hex(base["formats"]["hex"])
+        hsl = {}
+        for field in HSL_FIELDS:
+            value = changes.get(field)
+            if value is None and base is not None:
+                value = base[field]
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                raise ValueError(f"{field} debe ser un número.")
+            if not 0 <= value <= HSL_LIMITS[field]:
+                raise ValueError(f"{field} fuera de rango (0-{HSL_LIMITS[field]}).")
+            hsl[field] = int(round(value))
+        hue, saturation, lightness = hsl["hue"], hsl["saturation"], hsl["lightness"]
+        r, g, b = hsl_to_rgb(hue, saturation, lightness) if has_hsl or rgb is None else rgb
+        luminance = relative_luminance(r, g, b)
+        return {
+            "name": f"Color {index + 1}",
+            "hue": hue,
+            "saturation": saturation,
+            "lightness": lightness,
+            "formats": format_color(r, g, b, alpha),
+            "text": DARK_TEXT if luminance > 0.6 else LIGHT_TEXT,
+        }
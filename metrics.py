@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""Request timing, Prometheus-style metrics and opt-in profiling for the web app."""
+from __future__ import annotations
+
+import cProfile
+import os
+import pstats
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    def __init__(self, buckets: Tuple[float, ...] = DURATION_BUCKETS) -> None:
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.total += value
+        self.count += 1
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+
+    def render(self, name: str, labels: str) -> List[str]:
+        separator = "," if labels else ""
+        lines = [
+            f'{name}_bucket{{{labels}{separator}le="{bound}"}} {count}'
+            for bound, count in zip(self.buckets, self.counts)
+        ]
+        lines.append(f'{name}_bucket{{{labels}{separator}le="+Inf"}} {self.count}')
+        lines.append(f"{name}_sum{{{labels}}} {self.total}")
+        lines.append(f"{name}_count{{{labels}}} {self.count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Thread-safe request and stage duration histograms rendered in Prometheus text format."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._requests: Dict[Tuple[str, str, int], Histogram] = {}
+        self._stages: Dict[str, Histogram] = {}
+
+    def observe_request(self, method: str, route: str, status: int, seconds: float) -> None:
+        with self._lock:
+            key = (method, route, status)
+            if key not in self._requests:
+                self._requests[key] = Histogram()
+            self._requests[key].observe(seconds)
+
+    def observe_stage(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            if stage not in self._stages:
+                self._stages[stage] = Histogram()
+            self._stages[stage].observe(seconds)
+
+    def render(self, gauges: Optional[Dict[str, float]] = None) -> str:
+        lines = [
+            "# HELP palette_request_duration_seconds HTTP request latency.",
+            "# TYPE palette_request_duration_seconds histogram",
+        ]
+        with self._lock:
+            for (method, route, status), histogram in sorted(self._requests.items()):
+                labels = f'method="{method}",route="{route}",status="{status}"'
+                lines.extend(histogram.render("palette_request_duration_seconds", labels))
+            lines.append("# HELP palette_stage_duration_seconds Time spent per processing stage.")
+            lines.append("# TYPE palette_stage_duration_seconds histogram")
+            for stage, histogram in sorted(self._stages.items()):
+                lines.extend(histogram.render("palette_stage_duration_seconds", f'stage="{stage}"'))
+        declared = set()
+        for name, value in sorted((gauges or {}).items()):
+            base_name = name.split("{", 1)[0]
+            if base_name not in declared:
+                declared.add(base_name)
+                lines.append(f"# TYPE {base_name} gauge")
+            lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+class RequestTimings:
+    """Per-request stage durations (plus worker-thread profiles when profiling)."""
+
+    def __init__(self, profiling: bool = False) -> None:
+        self.stages: Dict[str, float] = {}
+        self.profiling = profiling
+        self.profiles: List[cProfile.Profile] = []
+        self._lock = threading.Lock()
+
+    def add(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def server_timing(self) -> str:
+        with self._lock:
+            return ", ".join(
+                f"{stage};dur={seconds * 1000:.2f}" for stage, seconds in self.stages.items()
+            )
+
+
+registry = MetricsRegistry()
+_current: ContextVar[Optional[RequestTimings]] = ContextVar("palette_request_timings", default=None)
+
+
+def record_stage(stage: str, seconds: float) -> None:
+    registry.observe_stage(stage, seconds)
+    timings = _current.get()
+    if timings is not None:
+        timings.add(stage, seconds)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(name, time.perf_counter() - start)
+
+
+def profiled(function: Callable[..., Any]) -> Callable[..., Any]:
+    """Wrap work sent to another thread so it is profiled along with the request."""
+    timings = _current.get()
+    if timings is None or not timings.profiling:
+        return function
+
+    def run(*args: Any, **kwargs: Any) -> Any:
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Python 3.12+ allows one profiler per process, and the request's
+            # profiler already sees this thread.
+            return function(*args, **kwargs)
+        try:
+            return function(*args, **kwargs)
+        finally:
+            profile.disable()
+            timings.profiles.append(profile)
+
+    return run
+
+
+class TimingMiddleware:
+    """ASGI middleware adding Server-Timing headers, request metrics and slow-request profiles.
+
+    Profiling is enabled by setting ``profile_slow_ms``: a ``sample_rate``
+    fraction of requests runs under cProfile (one at a time, since profiles
+    of interleaved coroutines would mix), and those slower than the threshold
+    are dumped to ``profile_dir`` as .prof files readable with pstats/snakeviz.
+    """
+
+    def __init__(
+        self,
+        app: Any,
+        profile_slow_ms: float = 0.0,
+        sample_rate: float = 1.0,
+        profile_dir: str = "profiles",
+    ) -> None:
+        self.app = app
+        self.profile_slow_ms = profile_slow_ms
+        self.sample_rate = sample_rate
+        self.profile_dir = profile_dir
+        self._profiling = threading.Lock()
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        profile = None
+        if (
+            self.profile_slow_ms > 0
+            and random.random() < self.sample_rate
+            and self._profiling.acquire(blocking=False)
+        ):
+            profile = cProfile.Profile()
+        timings = RequestTimings(profiling=profile is not None)
+        token = _current.set(timings)
+        status = 500
+        start = time.perf_counter()
+
+        async def send_with_timing(message: Dict[str, Any]) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                header = timings.server_timing()
+                total = f"total;dur={(time.perf_counter() - start) * 1000:.2f}"
+                header = f"{header}, {total}" if header else total
+                message.setdefault("headers", [])
+                message["headers"] = [*message["headers"], (b"server-timing", header.encode("latin-1"))]
+            await send(message)
+
+        if profile is not None:
+            try:
+                profile.enable()
+            except ValueError:
+                # Another profiler is already active (Python 3.12+ allows one).
+                profile = None
+                timings.profiling = False
+                self._profiling.release()
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            elapsed = time.perf_counter() - start
+            if profile is not None:
+                profile.disable()
+            _current.reset(token)
+            route = scope.get("route")
+            route_path = getattr(route, "path", "unmatched")
+            registry.observe_request(scope["method"], route_path, status, elapsed)
+            if profile is not None:
+                try:
+                    if elapsed * 1000 >= self.profile_slow_ms:
+                        self._dump_profile(profile, timings, route_path, elapsed)
+                finally:
+                    self._profiling.release()
+
+    def _dump_profile(
+        self, profile: cProfile.Profile, timings: RequestTimings, route: str, elapsed: float
+    ) -> None:
+        os.makedirs(self.profile_dir, exist_ok=True)
+        stats = pstats.Stats(profile)
+        for worker_profile in timings.profiles:
+            stats.add(worker_profile)
+        timestamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+        slug = route.strip("/").replace("/", "_") or "root"
+        stats.dump_stats(os.path.join(self.profile_dir, f"{timestamp}-{slug}-{elapsed * 1000:.0f}ms.prof"))
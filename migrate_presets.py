@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""Migrate and deduplicate the preset database (and legacy presets.json files)."""
+from __future__ import annotations
+
+import argparse
+import os
+
+from preset_store import PresetStore
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_DB_URL = os.environ.get(
+    "PRESETS_DB_URL", f"sqlite:///{os.path.join(BASE_DIR, 'data', 'presets.db')}"
+)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Actualiza el esquema de presets y fusiona los presets duplicados.",
+    )
+    parser.add_argument("--db-url", type=str, default=DEFAULT_DB_URL, help="URL de la base de presets.")
+    parser.add_argument(
+        "--json",
+        type=str,
+        default=None,
+        metavar="FICHERO",
+        help="Importa un presets.json (deduplicado) además de migrar la base.",
+    )
+    parser.add_argument(
+        "--vacuum",
+        action="store_true",
+        help="Compacta el fichero de la base al terminar para recuperar espacio.",
+    )
+    return parser
+
+
+def main() -> None:
+    args = build_parser().parse_args()
+    store = PresetStore(args.db_url)
+    if args.json:
+        read, created = store.import_json(args.json)
+        print(f"{args.json}: {read} presets leídos, {created} nuevos.")
+    kept, removed = store.deduplicate()
+    print(f"Presets únicos: {kept}. Duplicados fusionados: {removed}.")
+    if args.vacuum:
+        store.compact()
+
+
+if __name__ == "__main__":
+    main()
@@ -3,17 +3,43 @@
 from __future__ import annotations
 
 import argparse
-import json
+import csv
+import sys
+from collections import deque
+from dataclasses import replace
+from itertools import islice
+from multiprocessing import Pool
+from multiprocessing.pool import AsyncResult
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple, Union
 
-from palette_core import generate_palette
+import serializers
+from brand_colors import BrandColorExtractor
+from palette_core import (
+    PaletteSpec,
+    generate_palette,
+    generate_palettes_batch,
+    resolve_contrast_target,
+)
+from scales import MAX_STEPS, MIN_STEPS, SCALE_KINDS, generate_scale
+
+BATCH_CHUNK_SIZE = 64
+BATCH_CHUNKS_PER_WORKER = 2
+# (line index, spec or error message, logo path)
+Job = Tuple[int, Union[PaletteSpec, str], Optional[str]]
+# Per-process cache: repeated logos in a batch are decoded once per worker.
+logo_extractor = BrandColorExtractor()
 
 
 def build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(
         description="Genera paletas de color para diseñadores web a partir de un sentimiento/idea.",
     )
-    parser.add_argument("sentiment", help="Sentimiento principal (ej. calma, energia, confianza).")
-    parser.add_argument("idea", help="Idea o concepto de apoyo para la paleta.")
+    parser.add_argument(
+        "sentiment",
+        nargs="?",
+        help="Sentimiento principal (ej. calma, energia, confianza).",
+    )
+    parser.add_argument("idea", nargs="?", default="", help="Idea o concepto de apoyo para la paleta.")
     parser.add_argument("--count", type=int, default=5, help="Número de colores a generar.")
     parser.add_argument("--seed", type=int, default=None, help="Semilla opcional para reproducibilidad.")
     parser.add_argument(
@@ -28,6 +54,44 @@ def build_parser() -> argparse.ArgumentParser:
         default=None,
         help="Pista de marca o logo para mantener coherencia.",
     )
+    parser.add_argument(
+        "--target-contrast",
+        type=str,
+        default=None,
+        metavar="NIVEL",
+        help="Garantiza contraste de texto: AA, AA-large, AAA, AAA-large o un ratio (ej. 5.5).",
+    )
+    parser.add_argument(
+        "--logo",
+        type=str,
+        default=None,
+        metavar="FICHERO",
+        help="Imagen del logo: sus colores dominantes fijan los tonos base de la paleta.",
+    )
+    parser.add_argument(
+        "--cvd",
+        action="store_true",
+        help="Simula protanopia, deuteranopia y tritanopia y comprueba que los colores se distinguen.",
+    )
+    parser.add_argument(
+        "--scale",
+        type=str,
+        default=None,
+        choices=SCALE_KINDS,
+        help="Genera una escala para visualización de datos en lugar de una paleta.",
+    )
+    parser.add_argument(
+        "--steps",
+        type=int,
+        default=10,
+        help=f"Pasos de la escala ({MIN_STEPS}-{MAX_STEPS}).",
+    )
+    parser.add_argument(
+        "--no-monotonic",
+        dest="monotonic",
+        action="store_false",
+        help="No fuerza que la luminancia de la escala sea monótona.",
+    )
     parser.add_argument(
         "--ab",
         type=str,
@@ -35,14 +99,213 @@ def build_parser() -> argparse.ArgumentParser:
         metavar=("ESTILO_A", "ESTILO_B"),
         help="Genera un comparador A/B con dos estilos.",
     )
+    parser.add_argument(
+        "--compact",
+        action="store_true",
+        help="Imprime el JSON en una sola línea (más rápido para scripts).",
+    )
+    parser.add_argument(
+        "--batch",
+        type=str,
+        default=None,
+        metavar="FICHERO",
+        help="Procesa trabajos desde un CSV o NDJSON ('-' para stdin) y escribe NDJSON.",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Procesos para el modo --batch (el orden de salida se mantiene).",
+    )
+    parser.add_argument(
+        "--output",
+        type=str,
+        default="-",
+        help="Fichero de salida NDJSON para --batch ('-' para stdout).",
+    )
     return parser
 
 
+def read_job_rows(stream: TextIO) -> Iterator[Union[Dict[str, object], str]]:
+    """Yield one dict per CSV/NDJSON job line, or an error message for bad lines."""
+    first_line = stream.readline()
+    while first_line and not first_line.strip():
+        first_line = stream.readline()
+    if not first_line:
+        return
+    if first_line.lstrip().startswith("{"):
+        for line in _prepend(first_line, stream):
+            if not line.strip():
+                continue
+            try:
+                row = serializers.loads(line)
+            except ValueError:
+                yield "Línea JSON no válida."
+                continue
+            yield row if isinstance(row, dict) else "Cada línea debe ser un objeto JSON."
+        return
+    reader = csv.DictReader(_prepend(first_line, stream))
+    for row in reader:
+        yield {key: value for key, value in row.items() if key and value not in (None, "")}
+
+
+def _prepend(first_line: str, stream: TextIO) -> Iterator[str]:
+    yield first_line
+    yield from stream
+
+
+def _flag(value: object) -> bool:
+    if isinstance(value, str):
+        return value.strip().lower() in ("1", "true", "si", "sí", "yes")
+    return bool(value)
+
+
+def _text(value: object) -> Optional[str]:
+    if value is not None and not isinstance(value, str):
+        raise TypeError("expected a string")
+    return value
+
+
+def build_job(index: int, row: Union[Dict[str, object], str], args: argparse.Namespace) -> Job:
+    if isinstance(row, str):
+        return index, row, None
+    try:
+        seed = row.get("seed")
+        if seed is not None:
+            seed = int(seed)
+        elif args.seed is not None:
+            seed = args.seed + index
+        target_contrast = row.get("target_contrast", args.target_contrast)
+        if target_contrast is not None:
+            resolve_contrast_target(target_contrast)
+        return index, PaletteSpec(
+            sentiment=str(row.get("sentiment", args.sentiment or "")),
+            style=_text(row.get("style", args.style)),
+            seed=seed,
+            count=int(row.get("count", args.count)),
+            idea=str(row.get("idea", args.idea or "")),
+            brand_hint=_text(row.get("brand", args.brand)),
+            target_contrast=target_contrast,
+            simulate_cvd=_flag(row.get("cvd", args.cvd)),
+        ), _text(row.get("logo", args.logo))
+    except (TypeError, ValueError):
+        message = "Trabajo no válido (revisa count, seed, style, brand, logo y target_contrast)."
+        return index, message, None
+
+
+def load_logo(path: str) -> Dict[str, Any]:
+    try:
+        with open(path, "rb") as handle:
+            data = handle.read()
+    except OSError:
+        raise ValueError(f"No se pudo leer el logo {path}.") from None
+    return logo_extractor.extract(data)
+
+
+def apply_logo(spec: PaletteSpec, path: Optional[str]) -> Tuple[Union[PaletteSpec, str], Any]:
+    """Spec seeded with the logo's hues, plus the extracted colors (or an error message)."""
+    if not path:
+        return spec, None
+    try:
+        logo = load_logo(path)
+    except (ValueError, RuntimeError) as exc:
+        return str(exc), None
+    return replace(spec, base_hues=tuple(logo["base_hues"]) or None), logo
+
+
+def generate_job_lines(jobs: List[Job]) -> List[str]:
+    # Logos are decoded here, inside the worker processes.
+    resolved = []
+    for index, job, logo_path in jobs:
+        logo = None
+        if isinstance(job, PaletteSpec):
+            job, logo = apply_logo(job, logo_path)
+        resolved.append((index, job, logo))
+    specs = [job for _index, job, _logo in resolved if isinstance(job, PaletteSpec)]
+    palettes = iter(generate_palettes_batch(specs))
+    lines = []
+    for index, job, logo in resolved:
+        if isinstance(job, PaletteSpec):
+            line = {"index": index, "palette": next(palettes)}
+            if logo is not None:
+                line["logo"] = logo
+        else:
+            line = {"index": index, "error": job}
+        lines.append(serializers.dumps_text(line))
+    return lines
+
+
+def chunked(jobs: Iterable[Job], size: int) -> Iterator[List[Job]]:
+    iterator = iter(jobs)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def run_batch(args: argparse.Namespace) -> None:
+    source: TextIO = sys.stdin if args.batch == "-" else open(args.batch, "r", encoding="utf-8")
+    target: TextIO = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    try:
+        jobs = (build_job(index, row, args) for index, row in enumerate(read_job_rows(source)))
+        chunks = chunked(jobs, BATCH_CHUNK_SIZE)
+        if args.workers > 1:
+            with Pool(args.workers) as pool:
+                # Pool.imap would drain the whole input up front; keep only a
+                # few chunks per worker in flight so the input is read lazily.
+                pending: Deque[AsyncResult] = deque()
+                for chunk in chunks:
+                    pending.append(pool.apply_async(generate_job_lines, (chunk,)))
+                    if len(pending) >= args.workers * BATCH_CHUNKS_PER_WORKER:
+                        target.write("\n".join(pending.popleft().get()) + "\n")
+                while pending:
+                    target.write("\n".join(pending.popleft().get()) + "\n")
+        else:
+            for chunk in chunks:
+                target.write("\n".join(generate_job_lines(chunk)) + "\n")
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if target is not sys.stdout:
+            target.close()
+
+
 def main() -> None:
     parser = build_parser()
     args = parser.parse_args()
 
-    if args.ab:
+    if args.batch:
+        run_batch(args)
+        return
+    if not args.sentiment:
+        parser.error("Indica un sentimiento o usa --batch FICHERO.")
+    if args.target_contrast is not None:
+        try:
+            resolve_contrast_target(args.target_contrast)
+        except ValueError as exc:
+            parser.error(str(exc))
+    logo = None
+    if args.logo:
+        try:
+            logo = load_logo(args.logo)
+        except (ValueError, RuntimeError) as exc:
+            parser.error(str(exc))
+    base_hues = logo["base_hues"] if logo else None
+
+    if args.scale:
+        if not MIN_STEPS <= args.steps <= MAX_STEPS:
+            parser.error(f"--steps debe estar entre {MIN_STEPS} y {MAX_STEPS}.")
+        result = generate_scale(
+            args.scale,
+            args.steps,
+            args.sentiment,
+            args.idea,
+            args.style,
+            args.monotonic,
+            base_hues,
+        )
+    elif args.ab:
         style_a, style_b = args.ab
         result = {
             "comparison": {
@@ -53,6 +316,9 @@ def main() -> None:
                     args.seed,
                     style_a,
                     args.brand,
+                    target_contrast=args.target_contrast,
+                    simulate_cvd=args.cvd,
+                    base_hues=base_hues,
                 ),
                 "b": generate_palette(
                     args.sentiment,
@@ -61,6 +327,9 @@ def main() -> None:
                     args.seed,
                     style_b,
                     args.brand,
+                    target_contrast=args.target_contrast,
+                    simulate_cvd=args.cvd,
+                    base_hues=base_hues,
                 ),
             }
         }
@@ -72,8 +341,13 @@ def main() -> None:
             args.seed,
             args.style,
             args.brand,
+            target_contrast=args.target_contrast,
+            simulate_cvd=args.cvd,
+            base_hues=base_hues,
         )
-    print(json.dumps(result, ensure_ascii=False, indent=2))
+    if logo is not None:
+        result["logo"] = logo
+    print(serializers.dumps_text(result) if args.compact else serializers.dumps_pretty(result))
 
 
 if __name__ == "__main__":
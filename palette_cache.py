@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""Result cache for deterministic (seeded) palette requests."""
+from __future__ import annotations
+
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Protocol, Tuple
+
+import serializers
+from palette_core import pack_palette_result, unpack_palette_result
+
+
+class CacheBackend(Protocol):
+    """Shared key/value store holding serialized results (e.g. Redis, Memcached)."""
+
+    def get(self, key: str) -> Optional[bytes]:
+        ...
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        ...
+
+
+class LocalTTLCache:
+    """Thread-safe in-process LRU cache whose entries also expire after ``ttl`` seconds."""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 300.0) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        if self.maxsize <= 0:
+            return
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class InMemorySharedBackend:
+    """Local stand-in for a shared backend: stores bytes with an expiry, like SETEX."""
+
+    def __init__(self) -> None:
+        self._entries: Dict[str, Tuple[float, bytes]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self._entries[key]
+                return None
+            return entry[1]
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+
+
+class PaletteResultCache:
+    """Two-tier cache: a local LRU/TTL cache in front of an optional shared backend.
+
+    Palette results are held packed (see PackedPalette) and only expanded
+    back to the full color dicts when read.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        ttl: float = 300.0,
+        shared: Optional[CacheBackend] = None,
+    ) -> None:
+        self.ttl = ttl
+        self.local = LocalTTLCache(maxsize, ttl)
+        self.shared = shared
+
+    def get(self, key: str) -> Optional[Any]:
+        value = self.local.get(key)
+        if value is not None or self.shared is None:
+            return unpack_palette_result(value)
+        payload = self.shared.get(key)
+        if payload is None:
+            return None
+        value = pack_palette_result(unpack_palette_result(serializers.loads(payload)))
+        self.local.set(key, value)
+        return unpack_palette_result(value)
+
+    def set(self, key: str, value: Any) -> None:
+        value = pack_palette_result(value)
+        self.local.set(key, value)
+        if self.shared is not None:
+            self.shared.set(key, serializers.dumps(value), self.ttl)
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.local.hits, "misses": self.local.misses, "size": len(self.local)}
+
+
+def make_cache_key(kind: str, *parts: Any) -> str:
+    return f"{kind}:v1:" + json.dumps(parts, ensure_ascii=False, separators=(",", ":"))
@@ -2,9 +2,19 @@
 """Core palette generation utilities for the web palette agent."""
 from __future__ import annotations
 
+from array import array
+from contextlib import contextmanager
 from dataclasses import dataclass
-from typing import Dict, List, Tuple
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, Iterator, List, Sequence, Set, Tuple, Union
+import bisect
+import os
 import random
+import re
+import time
+import unicodedata
+
+import numpy as np
 
 
 @dataclass(frozen=True)
@@ -246,6 +256,7 @@ SENTIMENT_SYNONYMS: Dict[str, str] = {
     "bochorno": "verguenza",
     "remordimiento": "verguenza",
     "autocritica": "verguenza",
+    "autocrítica": "verguenza",
     "auto-crítica": "verguenza",
     "celos": "celos",
     "envidia": "celos",
@@ -265,6 +276,28 @@ SENTIMENT_SYNONYMS: Dict[str, str] = {
 }
 
 
+_stage_observer: Callable[[str, float], None] | None = None
+
+
+def set_stage_observer(observer: Callable[[str, float], None] | None) -> None:
+    """Register a callback receiving (stage, seconds) for each generation stage."""
+    global _stage_observer
+    _stage_observer = observer
+
+
+@contextmanager
+def timed_stage(name: str) -> Iterator[None]:
+    observer = _stage_observer
+    if observer is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observer(name, time.perf_counter() - start)
+
+
 def clamp(value: float, minimum: float, maximum: float) -> float:
     return max(minimum, min(value, maximum))
 
@@ -297,6 +330,15 @@ def hsl_to_rgb(h: float, s: float, l: float) -> Tuple[int, int, int]:
     return r, g, b
 
 
+def parse_hex(value: str) -> Tuple[int, int, int]:
+    value = value.strip().lstrip("#")
+    if len(value) == 3:
+        value = "".join(char * 2 for char in value)
+    if len(value) != 6:
+        raise ValueError(f"Color hexadecimal no válido: {value}")
+    return int(value[0:2], 16), int(value[2:4], 16), int(value[4:6], 16)
+
+
 def rgb_to_hsl(r: int, g: int, b: int) -> Tuple[int, int, int]:
     r_n = clamp(r, 0, 255) / 255
     g_n = clamp(g, 0, 255) / 255
@@ -323,9 +365,39 @@ def rgb_to_hsl(r: int, g: int, b: int) -> Tuple[int, int, int]:
     return int(round(h)), int(round(s * 100)), int(round(l * 100))
 
 
+CONVERSION_CACHE_SIZE = int(os.environ.get("PALETTE_CONVERSION_CACHE_SIZE", "65536"))
+
+cached_hsl_to_rgb: Callable[[float, float, float], Tuple[int, int, int]] = lru_cache(
+    maxsize=CONVERSION_CACHE_SIZE
+)(hsl_to_rgb)
+cached_rgb_to_hsl: Callable[[int, int, int], Tuple[int, int, int]] = lru_cache(
+    maxsize=CONVERSION_CACHE_SIZE
+)(rgb_to_hsl)
+
+
+def configure_conversion_cache(maxsize: int) -> None:
+    """Resize (and reset) the HSL<->RGB memo; maxsize=0 disables memoization."""
+    global cached_hsl_to_rgb, cached_rgb_to_hsl
+    cached_hsl_to_rgb = lru_cache(maxsize=maxsize)(hsl_to_rgb)
+    cached_rgb_to_hsl = lru_cache(maxsize=maxsize)(rgb_to_hsl)
+
+
+def conversion_cache_info() -> Dict[str, Dict[str, int | None]]:
+    stats = {}
+    for name, function in (("hsl_to_rgb", cached_hsl_to_rgb), ("rgb_to_hsl", cached_rgb_to_hsl)):
+        info = function.cache_info()
+        stats[name] = {
+            "hits": info.hits,
+            "misses": info.misses,
+            "size": info.currsize,
+            "maxsize": info.maxsize,
+        }
+    return stats
+
+
 def format_color(r: int, g: int, b: int, alpha: float) -> Dict[str, str]:
     hex_value = f"#{r:02X}{g:02X}{b:02X}"
-    h, s, l = rgb_to_hsl(r, g, b)
+    h, s, l = cached_rgb_to_hsl(r, g, b)
     return {
         "rgb": f"rgb({r}, {g}, {b})",
         "rgba": f"rgba({r}, {g}, {b}, {alpha:.2f})",
@@ -335,14 +407,26 @@ def format_color(r: int, g: int, b: int, alpha: float) -> Dict[str, str]:
     }
 
 
-def relative_luminance(r: int, g: int, b: int) -> float:
-    def channel(value: int) -> float:
-        normalized_value = clamp(value, 0, 255) / 255
-        return normalized_value / 12.92 if normalized_value <= 0.04045 else ((normalized_value + 0.055) / 1.055) ** 2.4
+def _srgb_to_linear(value: float) -> float:
+    normalized_value = clamp(value, 0, 255) / 255
+    return normalized_value / 12.92 if normalized_value <= 0.04045 else ((normalized_value + 0.055) / 1.055) ** 2.4
+
+
+# Linearized sRGB value for every 8-bit channel; palette colors always have
+# integer channels, so luminance never needs to call pow() at request time.
+SRGB_LINEAR_TABLE: Tuple[float, ...] = tuple(_srgb_to_linear(value) for value in range(256))
+
+
+def linearize_channel(value: float) -> float:
+    if isinstance(value, int) and 0 <= value <= 255:
+        return SRGB_LINEAR_TABLE[value]
+    return _srgb_to_linear(value)
 
-    r_l = channel(r)
-    g_l = channel(g)
-    b_l = channel(b)
+
+def relative_luminance(r: int, g: int, b: int) -> float:
+    r_l = linearize_channel(r)
+    g_l = linearize_channel(g)
+    b_l = linearize_channel(b)
     return 0.2126 * r_l + 0.7152 * g_l + 0.0722 * b_l
 
 
@@ -354,9 +438,175 @@ def contrast_ratio(rgb1: Tuple[int, int, int], rgb2: Tuple[int, int, int]) -> fl
     return (lighter + 0.05) / (darker + 0.05)
 
 
+DARK_TEXT = "#0f172a"
+LIGHT_TEXT = "#f8fafc"
+TEXT_LUMINANCE: Dict[str, float] = {
+    DARK_TEXT: relative_luminance(15, 23, 42),
+    LIGHT_TEXT: relative_luminance(248, 250, 252),
+}
+
+# WCAG 2.x minimum contrast ratios for text over a background color.
+CONTRAST_TARGETS: Dict[str, float] = {
+    "aa": 4.5,
+    "aa-large": 3.0,
+    "aaa": 7.0,
+    "aaa-large": 4.5,
+}
+
+
 def best_text_color(rgb: Tuple[int, int, int]) -> str:
     luminance = relative_luminance(*rgb)
-    return "#0f172a" if luminance > 0.6 else "#f8fafc"
+    return DARK_TEXT if luminance > 0.6 else LIGHT_TEXT
+
+
+def resolve_contrast_target(target: str | float) -> Tuple[str, float]:
+    """Map a WCAG level ("AA", "AAA-large"...) or explicit ratio to (label, ratio)."""
+    if isinstance(target, str):
+        key = target.strip().lower().replace("_", "-").replace(" ", "-")
+        if key in CONTRAST_TARGETS:
+            return key, CONTRAST_TARGETS[key]
+        try:
+            target = float(key)
+        except ValueError:
+            raise ValueError(f"Nivel de contraste no soportado: {target}") from None
+    ratio = float(target)
+    if not 1.0 <= ratio <= 21.0:
+        raise ValueError("El contraste objetivo debe estar entre 1 y 21.")
+    return f"{ratio:g}", ratio
+
+
+def _text_ratio(hue: int, saturation: int, lightness: int, text: str) -> float:
+    luminance = relative_luminance(*cached_hsl_to_rgb(hue, saturation, lightness))
+    text_luminance = TEXT_LUMINANCE[text]
+    return (max(luminance, text_luminance) + 0.05) / (min(luminance, text_luminance) + 0.05)
+
+
+def _search_lightness(
+    hue: int, saturation: int, lightness: int, text: str, target: float
+) -> int | None:
+    """Closest lightness reaching ``target`` against ``text``, by binary search.
+
+    RGB channels never decrease as HSL lightness grows, so luminance is
+    monotonic in lightness: contrast with dark text only improves when
+    lightening and contrast with light text only improves when darkening.
+    """
+    def passes(value: int) -> bool:
+        return _text_ratio(hue, saturation, value, text) >= target
+
+    if text == DARK_TEXT:
+        low, high = lightness, 100
+        if not passes(high):
+            return None
+        while low < high:
+            middle = (low + high) // 2
+            if passes(middle):
+                high = middle
+            else:
+                low = middle + 1
+        return low
+    low, high = 0, lightness
+    if not passes(low):
+        return None
+    while low < high:
+        middle = (low + high + 1) // 2
+        if passes(middle):
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+def repair_contrast(
+    samples: List[Tuple[int, int, int, float]],
+    profile: PaletteProfile,
+    target: str | float,
+) -> Tuple[List[Tuple[int, int, int, float]], List[str], Dict[str, object]]:
+    """Adjust lightness so every color reaches ``target`` against its text color.
+
+    For each failing color both text colors are tried; the smallest lightness
+    change wins, preferring results inside the profile's lightness range.
+    Returns the repaired samples, the text color for each one and a report.
+    """
+    level, ratio = resolve_contrast_target(target)
+    low, high = profile.lightness_range
+    repaired = []
+    texts = []
+    adjustments = []
+    met = True
+    for index, (hue, saturation, lightness, alpha) in enumerate(samples):
+        default_text = best_text_color(cached_hsl_to_rgb(hue, saturation, lightness))
+        if _text_ratio(hue, saturation, lightness, default_text) >= ratio:
+            repaired.append((hue, saturation, lightness, alpha))
+            texts.append(default_text)
+            continue
+        candidates = []
+        for text in (default_text, LIGHT_TEXT if default_text == DARK_TEXT else DARK_TEXT):
+            found = _search_lightness(hue, saturation, lightness, text, ratio)
+            if found is not None:
+                within = low <= found <= high
+                candidates.append((not within, abs(found - lightness), text != default_text, found, text))
+        if not candidates:
+            met = False
+            repaired.append((hue, saturation, lightness, alpha))
+            texts.append(default_text)
+            continue
+        _outside, _delta, _swapped, new_lightness, text = min(candidates)
+        repaired.append((hue, saturation, new_lightness, alpha))
+        texts.append(text)
+        adjustments.append(
+            {
+                "index": index,
+                "lightness": [lightness, new_lightness],
+                "text": text,
+                "ratio": round(_text_ratio(hue, saturation, new_lightness, text), 2),
+                "within_profile": low <= new_lightness <= high,
+            }
+        )
+    report = {
+        "level": level,
+        "target": ratio,
+        "met": met,
+        "adjustments": adjustments,
+        "note": (
+            f"Todos los colores alcanzan {ratio:g}:1 con su color de texto."
+            if met
+            else f"Algunos colores no pueden alcanzar {ratio:g}:1 con texto claro ni oscuro."
+        ),
+    }
+    return repaired, texts, report
+
+
+def min_contrast_pair(luminances: Sequence[float]) -> Tuple[float, Tuple[int, int] | None]:
+    """Lowest pairwise contrast ratio and the (sorted) indexes of that pair.
+
+    The ratio grows with the luminance gap, so after sorting by luminance the
+    minimum is always between neighbours: O(n log n) instead of O(n^2).
+    """
+    order = sorted(range(len(luminances)), key=luminances.__getitem__)
+    min_ratio = 0.0
+    min_pair = None
+    for darker, lighter in zip(order, order[1:]):
+        ratio = (luminances[lighter] + 0.05) / (luminances[darker] + 0.05)
+        if min_pair is None or ratio < min_ratio:
+            min_ratio = ratio
+            min_pair = (min(darker, lighter), max(darker, lighter))
+    return min_ratio, min_pair
+
+
+def contrast_note(min_contrast: float) -> str:
+    if min_contrast < 4.5:
+        return "Contraste bajo detectado, considera ajustar luminosidad o saturación."
+    return "Contraste general adecuado para texto estándar."
+
+
+def contrast_matrix(luminances: Sequence[float]) -> List[List[float]]:
+    matrix = []
+    for l1 in luminances:
+        row = []
+        for l2 in luminances:
+            row.append(round((max(l1, l2) + 0.05) / (min(l1, l2) + 0.05), 2))
+        matrix.append(row)
+    return matrix
 
 
 def harmony_suggestions(base_hue: int) -> List[Dict[str, object]]:
@@ -367,64 +617,239 @@ def harmony_suggestions(base_hue: int) -> List[Dict[str, object]]:
     ]
 
 
-def generate_palette(
-    sentiment: str,
-    idea: str,
-    count: int,
-    seed: int | None,
-    style: str | None,
-    brand_hint: str | None,
-) -> Dict[str, object]:
-    normalized = (sentiment or "").strip().lower()
-    normalized = SENTIMENT_SYNONYMS.get(normalized, normalized)
-    profile = PROFILES.get(normalized, PROFILES["confianza"])
-
-    style_key = (style or "").strip().lower()
-    style_modifier = STYLE_MODIFIERS.get(style_key)
-    if style_modifier:
-        profile = PaletteProfile(
-            name=f"{profile.name}-{style_key}",
-            base_hues=profile.base_hues,
-            saturation_range=style_modifier["saturation_range"],
-            lightness_range=style_modifier["lightness_range"],
-            notes=f"{profile.notes} Estilo aplicado: {style_key}.",
+def fold_text(text: str) -> str:
+    """Lowercase, strip accents and collapse punctuation/whitespace to single spaces."""
+    decomposed = unicodedata.normalize("NFKD", (text or "").lower())
+    stripped = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return " ".join(re.findall(r"[a-z0-9]+", stripped))
+
+
+def _written_words(text: str) -> List[str]:
+    """Lowercase words with their accents kept (the unfolded side of fold_text)."""
+    return re.findall(r"[^\W_]+", unicodedata.normalize("NFC", (text or "").lower()))
+
+
+def _trigrams(term: str) -> Set[str]:
+    padded = f"  {term} "
+    return {padded[index:index + 3] for index in range(len(padded) - 2)}
+
+
+def _edit_distance(left: str, right: str, limit: int) -> int:
+    """Optimal string alignment distance (adjacent swaps cost 1), capped at ``limit + 1``."""
+    if abs(len(left) - len(right)) > limit:
+        return limit + 1
+    before: List[int] = []
+    previous = list(range(len(right) + 1))
+    for row, left_char in enumerate(left, start=1):
+        current = [row]
+        for column, right_char in enumerate(right, start=1):
+            distance = min(
+                previous[column] + 1,
+                current[column - 1] + 1,
+                previous[column - 1] + (left_char != right_char),
+            )
+            if (
+                row > 1
+                and column > 1
+                and left_char == right[column - 2]
+                and left[row - 2] == right_char
+            ):
+                distance = min(distance, before[column - 2] + 1)
+            current.append(distance)
+        if min(current) > limit:
+            return limit + 1
+        before, previous = previous, current
+    return previous[-1]
+
+
+class ProfileResolver:
+    """Sentiment/style lookup index built once from the profile tables.
+
+    Sentiments are accent-folded and matched, in order, as an exact term, as
+    a phrase inside the sentiment, by prefix, by trigram similarity (bounded
+    edit distance over a few candidates) and finally as a phrase inside the
+    idea, where accents are respected (see ``match_idea``). Every
+    (profile, style) combination is built ahead of time.
+    """
+
+    FUZZY_CANDIDATES = 8
+    MIN_PREFIX = 4
+    # Terms that are mostly not feelings in free text ("vale la pena", "poder hacer").
+    IDEA_AMBIGUOUS_TERMS = frozenset({"pena", "poder"})
+
+    def __init__(
+        self,
+        profiles: Dict[str, PaletteProfile],
+        synonyms: Dict[str, str],
+        styles: Dict[str, Dict[str, Tuple[int, int]]],
+        default: str = "confianza",
+        cache_size: int = 4096,
+    ) -> None:
+        self.profiles = profiles
+        self.default = default
+        self.terms: Dict[str, str] = {fold_text(name): name for name in profiles}
+        for synonym, name in synonyms.items():
+            self.terms.setdefault(fold_text(synonym), name)
+        self.spellings: Dict[str, Set[str]] = {}
+        for written in (*profiles, *synonyms):
+            self.spellings.setdefault(fold_text(written), set()).add(
+                " ".join(_written_words(written))
+            )
+        self.max_words = max(len(term.split()) for term in self.terms)
+        self.sorted_terms = sorted(self.terms)
+        self.trigram_index: Dict[str, List[str]] = {}
+        for term in self.sorted_terms:
+            for trigram in _trigrams(term):
+                self.trigram_index.setdefault(trigram, []).append(term)
+        self.styles = {fold_text(style): style for style in styles}
+        self.combinations: Dict[Tuple[str, str], PaletteProfile] = {}
+        for name, profile in profiles.items():
+            self.combinations[(name, "")] = profile
+            for style_key, modifier in styles.items():
+                self.combinations[(name, style_key)] = PaletteProfile(
+                    name=f"{profile.name}-{style_key}",
+                    base_hues=profile.base_hues,
+                    saturation_range=modifier["saturation_range"],
+                    lightness_range=modifier["lightness_range"],
+                    notes=f"{profile.notes} Estilo aplicado: {style_key}.",
+                )
+        self.match_sentiment = lru_cache(maxsize=cache_size)(self._match_sentiment)
+
+    def match_phrase(self, folded: str) -> str | None:
+        """Longest known term appearing as whole words in ``folded`` text."""
+        words = folded.split()
+        for size in range(min(self.max_words, len(words)), 0, -1):
+            for start in range(len(words) - size + 1):
+                name = self.terms.get(" ".join(words[start:start + size]))
+                if name is not None:
+                    return name
+        return None
+
+    def match_prefix(self, folded: str) -> str | None:
+        if len(folded) < self.MIN_PREFIX:
+            return None
+        start = bisect.bisect_left(self.sorted_terms, folded)
+        names = set()
+        for term in self.sorted_terms[start:]:
+            if not term.startswith(folded):
+                break
+            names.add(self.terms[term])
+        return names.pop() if len(names) == 1 else None
+
+    def match_fuzzy(self, folded: str) -> str | None:
+        if len(folded) < 3:
+            return None
+        shared: Dict[str, int] = {}
+        for trigram in _trigrams(folded):
+            for term in self.trigram_index.get(trigram, ()):
+                shared[term] = shared.get(term, 0) + 1
+        candidates = sorted(shared, key=lambda term: (-shared[term], term))[: self.FUZZY_CANDIDATES]
+        limit = 1 if len(folded) <= 6 else 2 if len(folded) <= 9 else 3
+        best: Tuple[int, int, str] | None = None
+        for term in candidates:
+            distance = _edit_distance(folded, term, limit)
+            if distance <= limit and (best is None or (distance, -shared[term]) < best[:2]):
+                best = (distance, -shared[term], term)
+        return self.terms[best[2]] if best else None
+
+    def match_idea(self, idea: str) -> str | None:
+        """Longest known term written as whole words in the idea.
+
+        The idea is free text, so accents are kept: "irá" is not "ira". Words
+        typed without any accents still match, and IDEA_AMBIGUOUS_TERMS never do.
+        """
+        words = [word for word in _written_words(idea) if len(fold_text(word).split()) == 1]
+        folded = [fold_text(word) for word in words]
+        for size in range(min(self.max_words, len(words)), 0, -1):
+            for start in range(len(words) - size + 1):
+                term = " ".join(folded[start:start + size])
+                name = self.terms.get(term)
+                if name is None or term in self.IDEA_AMBIGUOUS_TERMS:
+                    continue
+                written = " ".join(words[start:start + size])
+                if written.isascii() or written in self.spellings[term]:
+                    return name
+        return None
+
+    def _match_sentiment(self, sentiment: str) -> str | None:
+        folded = fold_text(sentiment)
+        if not folded:
+            return None
+        return (
+            self.terms.get(folded)
+            or self.match_phrase(folded)
+            or self.match_prefix(folded)
+            or self.match_fuzzy(folded)
         )
 
+    def resolve(
+        self, sentiment: str, style: str | None, idea: str = ""
+    ) -> Tuple[PaletteProfile, str]:
+        name = self.match_sentiment(sentiment or "")
+        if name is None and idea:
+            name = self.match_idea(idea)
+        style_key = (style or "").strip().lower()
+        style_key = self.styles.get(fold_text(style_key), style_key)
+        profile = self.combinations.get((name or self.default, style_key))
+        if profile is None:
+            profile = self.combinations[(name or self.default, "")]
+        return profile, style_key
+
+
+PROFILE_RESOLVER = ProfileResolver(PROFILES, SENTIMENT_SYNONYMS, STYLE_MODIFIERS)
+
+
+def resolve_profile(
+    sentiment: str, style: str | None, idea: str = ""
+) -> Tuple[PaletteProfile, str]:
+    return PROFILE_RESOLVER.resolve(sentiment, style, idea)
+
+
+def seed_base_hues(profile: PaletteProfile, base_hues: Sequence[int] | None) -> PaletteProfile:
+    """Profile with its base hues replaced (e.g. by hues extracted from a logo)."""
+    if not base_hues:
+        return profile
+    return PaletteProfile(
+        name=profile.name,
+        base_hues=[int(hue) % 360 for hue in base_hues],
+        saturation_range=profile.saturation_range,
+        lightness_range=profile.lightness_range,
+        notes=f"{profile.notes} Tonos base tomados de la marca.",
+    )
+
+
+def sample_hsla(
+    profile: PaletteProfile, count: int, seed: int | None
+) -> List[Tuple[int, int, int, float]]:
     rng = random.Random(seed)
-    colors = []
-    rgb_values: List[Tuple[int, int, int]] = []
+    samples = []
     for index in range(count):
         hue_base = profile.base_hues[index % len(profile.base_hues)]
         hue_variation = rng.randint(-8, 8)
         hue = (hue_base + hue_variation) % 360
         saturation = rng.randint(*profile.saturation_range)
         lightness = rng.randint(*profile.lightness_range)
-        r, g, b = hsl_to_rgb(hue, saturation, lightness)
         alpha = rng.uniform(0.75, 0.95)
-        rgb_values.append((r, g, b))
-        colors.append(
-            {
-                "name": f"Color {index + 1}",
-                "hue": hue,
-                "saturation": saturation,
-                "lightness": lightness,
-                "formats": format_color(r, g, b, alpha),
-                "text": best_text_color((r, g, b)),
-            }
-        )
+        samples.append((hue, saturation, lightness, alpha))
+    return samples
 
-    contrast_pairs = []
-    for i in range(len(rgb_values)):
-        for j in range(i + 1, len(rgb_values)):
-            ratio = contrast_ratio(rgb_values[i], rgb_values[j])
-            contrast_pairs.append(ratio)
-    min_contrast = min(contrast_pairs) if contrast_pairs else 0.0
-    contrast_note = (
-        "Contraste bajo detectado, considera ajustar luminosidad o saturación."
-        if min_contrast < 4.5
-        else "Contraste general adecuado para texto estándar."
-    )
 
+BRAND_SUGGESTION = "Considera extraer un color principal del logo para mantener coherencia de marca."
+
+
+def build_palette_result(
+    sentiment: str,
+    idea: str,
+    profile: PaletteProfile,
+    style_key: str,
+    brand_hint: str | None,
+    colors: List[Dict[str, object]],
+    min_contrast: float,
+    min_pair: Tuple[int, int] | None,
+    matrix: List[List[float]] | None = None,
+    text_contrast: Dict[str, object] | None = None,
+    cvd: Dict[str, object] | None = None,
+) -> Dict[str, object]:
     suggestions = [
         "Ajusta el contraste según WCAG para textos y fondos.",
         "Define un color dominante, dos secundarios y dos de acento.",
@@ -435,21 +860,26 @@ def generate_palette(
         "Guarda presets por marca para mantener coherencia entre campañas.",
     ]
     if brand_hint:
-        suggestions.append(
-            "Considera extraer un color principal del logo para mantener coherencia de marca."
-        )
+        suggestions.append(BRAND_SUGGESTION)
+
+    contrast = {
+        "min_ratio": round(min_contrast, 2),
+        "note": contrast_note(min_contrast),
+        "pair": list(min_pair) if min_pair else None,
+    }
+    if matrix is not None:
+        contrast["matrix"] = matrix
+    if text_contrast is not None:
+        contrast["text"] = text_contrast
 
     base_hue = colors[0]["hue"] if colors else 0
-    return {
+    result = {
         "sentiment": sentiment,
         "idea": idea,
         "profile": profile.name,
         "notes": profile.notes,
         "palette": colors,
-        "contrast": {
-            "min_ratio": round(min_contrast, 2),
-            "note": contrast_note,
-        },
+        "contrast": contrast,
         "harmony": harmony_suggestions(base_hue),
         "brand_hint": brand_hint,
         "style": style_key or None,
@@ -459,6 +889,92 @@ def generate_palette(
         ],
         "suggestions": suggestions,
     }
+    if cvd is not None:
+        result["cvd"] = cvd
+    return result
+
+
+def personalize_palette(
+    result: Dict[str, object],
+    sentiment: str,
+    idea: str,
+    brand_hint: str | None,
+) -> Dict[str, object]:
+    """Copy of a shared/cached palette result carrying this request's own fields."""
+    personalized = dict(result)
+    personalized["sentiment"] = sentiment
+    personalized["idea"] = idea
+    personalized["brand_hint"] = brand_hint
+    suggestions = [item for item in result["suggestions"] if item != BRAND_SUGGESTION]
+    if brand_hint:
+        suggestions.append(BRAND_SUGGESTION)
+    personalized["suggestions"] = suggestions
+    return personalized
+
+
+def generate_palette(
+    sentiment: str,
+    idea: str,
+    count: int,
+    seed: int | None,
+    style: str | None,
+    brand_hint: str | None,
+    full_contrast_matrix: bool = False,
+    target_contrast: str | float | None = None,
+    simulate_cvd: bool = False,
+    base_hues: Sequence[int] | None = None,
+) -> Dict[str, object]:
+    with timed_stage("resolve"):
+        profile, style_key = resolve_profile(sentiment, style, idea)
+        profile = seed_base_hues(profile, base_hues)
+
+    colors = []
+    luminances: List[float] = []
+    rgb_values: List[Tuple[int, int, int]] = []
+    texts: List[str] | None = None
+    text_contrast = None
+    with timed_stage("colors"):
+        samples = sample_hsla(profile, count, seed)
+        if target_contrast is not None:
+            samples, texts, text_contrast = repair_contrast(samples, profile, target_contrast)
+        for index, (hue, saturation, lightness, alpha) in enumerate(samples):
+            r, g, b = cached_hsl_to_rgb(hue, saturation, lightness)
+            luminance = relative_luminance(r, g, b)
+            luminances.append(luminance)
+            rgb_values.append((r, g, b))
+            colors.append(
+                {
+                    "name": f"Color {index + 1}",
+                    "hue": hue,
+                    "saturation": saturation,
+                    "lightness": lightness,
+                    "formats": format_color(r, g, b, alpha),
+                    "text": texts[index] if texts else (DARK_TEXT if luminance > 0.6 else LIGHT_TEXT),
+                }
+            )
+
+    with timed_stage("contrast"):
+        min_contrast, min_pair = min_contrast_pair(luminances)
+        matrix = contrast_matrix(luminances) if full_contrast_matrix else None
+
+    cvd = None
+    if simulate_cvd:
+        with timed_stage("cvd"):
+            cvd = cvd_reports(np.array(rgb_values, dtype=np.int64).reshape(1, -1, 3))[0]
+
+    return build_palette_result(
+        sentiment,
+        idea,
+        profile,
+        style_key,
+        brand_hint,
+        colors,
+        min_contrast,
+        min_pair,
+        matrix,
+        text_contrast,
+        cvd,
+    )
 
 
 def generate_ai_variations(
@@ -467,55 +983,502 @@ def generate_ai_variations(
     count: int,
     seed: int | None,
 ) -> List[Dict[str, object]]:
-    styles = ["minimalista", "retro", "futurista"]
-    variations = []
-    for index, style in enumerate(styles):
-        variations.append(
-            generate_palette(
-                sentiment,
-                idea,
-                count,
-                None if seed is None else seed + index + 1,
-                style,
-                None,
-            )
+    return generate_palettes_batch(ai_variation_specs(sentiment, idea, count, seed))
+
+
+@dataclass(frozen=True)
+class PaletteSpec:
+    sentiment: str
+    style: str | None = None
+    seed: int | None = None
+    count: int = 5
+    idea: str = ""
+    brand_hint: str | None = None
+    full_contrast_matrix: bool = False
+    target_contrast: str | float | None = None
+    simulate_cvd: bool = False
+    base_hues: Tuple[int, ...] | None = None
+
+
+AI_VARIATION_STYLES = ("minimalista", "retro", "futurista")
+
+
+def ai_variation_specs(
+    sentiment: str,
+    idea: str,
+    count: int,
+    seed: int | None,
+) -> List[PaletteSpec]:
+    return [
+        PaletteSpec(
+            sentiment,
+            style,
+            None if seed is None else seed + index + 1,
+            count,
+            idea,
         )
-    return variations
+        for index, style in enumerate(AI_VARIATION_STYLES)
+    ]
 
 
-def build_design_tokens(palette: List[Dict[str, object]]) -> Dict[str, str]:
-    tokens = {}
-    for index, color in enumerate(palette, start=1):
-        formats = color.get("formats", {})
-        if isinstance(formats, dict):
-            tokens[f"palette-{index}"] = formats.get("hex", "")
-    return tokens
+LINEAR_CHANNEL_TABLE = np.array(SRGB_LINEAR_TABLE, dtype=np.float64)
 
 
-def export_tokens_to_css(palette: List[Dict[str, object]]) -> str:
-    tokens = build_design_tokens(palette)
-    lines = [":root {"]
-    for key, value in tokens.items():
-        lines.append(f"  --{key}: {value};")
-    lines.append("}")
-    return "\n".join(lines)
+def hsl_to_rgb_array(h: np.ndarray, s: np.ndarray, l: np.ndarray) -> np.ndarray:
+    """Vectorized hsl_to_rgb; returns an (n, 3) integer array."""
+    h = np.mod(np.asarray(h, dtype=np.float64), 360)
+    s = np.clip(np.asarray(s, dtype=np.float64), 0, 100) / 100
+    l = np.clip(np.asarray(l, dtype=np.float64), 0, 100) / 100
 
+    c = (1 - np.abs(2 * l - 1)) * s
+    x = c * (1 - np.abs(np.mod(h / 60, 2) - 1))
+    m = l - c / 2
+    zero = np.zeros_like(c)
 
-def export_tokens_to_tailwind(palette: List[Dict[str, object]]) -> Dict[str, object]:
-    tokens = build_design_tokens(palette)
-    return {
-        "theme": {
-            "extend": {
-                "colors": tokens,
+    sectors = [h < 60, h < 120, h < 180, h < 240, h < 300]
+    r1 = np.select(sectors, [c, x, zero, zero, x], default=c)
+    g1 = np.select(sectors, [x, c, c, x, zero], default=zero)
+    b1 = np.select(sectors, [zero, zero, x, c, c], default=x)
+
+    rgb = np.stack([r1, g1, b1], axis=-1) + m[..., None]
+    return np.rint(rgb * 255).astype(np.int64)
+
+
+def rgb_to_hsl_array(rgb: np.ndarray) -> np.ndarray:
+    """Vectorized rgb_to_hsl over an (n, 3) array; returns an (n, 3) integer array."""
+    normalized = np.clip(np.asarray(rgb, dtype=np.float64), 0, 255) / 255
+    r_n, g_n, b_n = normalized[..., 0], normalized[..., 1], normalized[..., 2]
+    max_c = np.maximum(np.maximum(r_n, g_n), b_n)
+    min_c = np.minimum(np.minimum(r_n, g_n), b_n)
+    delta = max_c - min_c
+
+    l = (max_c + min_c) / 2
+
+    chromatic = delta != 0
+    safe_delta = np.where(chromatic, delta, 1.0)
+    safe_denominator = np.where(chromatic, 1 - np.abs(2 * l - 1), 1.0)
+    s = np.where(chromatic, delta / safe_denominator, 0.0)
+    h = np.select(
+        [max_c == r_n, max_c == g_n],
+        [np.mod((g_n - b_n) / safe_delta, 6), (b_n - r_n) / safe_delta + 2],
+        default=(r_n - g_n) / safe_delta + 4,
+    )
+    h = np.where(chromatic, h * 60, 0.0)
+
+    return np.stack([np.rint(h), np.rint(s * 100), np.rint(l * 100)], axis=-1).astype(np.int64)
+
+
+def relative_luminance_array(rgb: np.ndarray) -> np.ndarray:
+    channels = np.clip(np.asarray(rgb, dtype=np.int64), 0, 255)
+    linear = LINEAR_CHANNEL_TABLE[channels]
+    return 0.2126 * linear[..., 0] + 0.7152 * linear[..., 1] + 0.0722 * linear[..., 2]
+
+
+# Linear sRGB -> LMS -> OKLab (Björn Ottosson, 2020).
+OKLAB_LMS_MATRIX = np.array(
+    [
+        [0.4122214708, 0.5363325363, 0.0514459929],
+        [0.2119034982, 0.6806995451, 0.1073969566],
+        [0.0883024619, 0.2817188376, 0.6299787005],
+    ]
+)
+OKLAB_MATRIX = np.array(
+    [
+        [0.2104542553, 0.7936177850, -0.0040720468],
+        [1.9779984951, -2.4285922050, 0.4505937099],
+        [0.0259040371, 0.7827717662, -0.8086757660],
+    ]
+)
+
+
+def linear_rgb_to_oklab_array(linear: np.ndarray) -> np.ndarray:
+    """(..., 3) linear RGB in [0, 1] to OKLab."""
+    return np.cbrt(linear @ OKLAB_LMS_MATRIX.T) @ OKLAB_MATRIX.T
+
+
+def srgb_to_oklab_array(rgb: np.ndarray) -> np.ndarray:
+    """(n, 3) 8-bit sRGB to (n, 3) OKLab, linearizing through the shared lookup table."""
+    channels = np.clip(np.asarray(rgb, dtype=np.int64), 0, 255)
+    return linear_rgb_to_oklab_array(LINEAR_CHANNEL_TABLE[channels])
+
+
+OKLAB_INVERSE_MATRIX = np.linalg.inv(OKLAB_MATRIX)
+OKLAB_LMS_INVERSE_MATRIX = np.linalg.inv(OKLAB_LMS_MATRIX)
+
+
+def oklab_to_linear_rgb_array(lab: np.ndarray) -> np.ndarray:
+    """(..., 3) OKLab to linear RGB; out-of-gamut colors fall outside [0, 1]."""
+    return (lab @ OKLAB_INVERSE_MATRIX.T) ** 3 @ OKLAB_LMS_INVERSE_MATRIX.T
+
+
+def linear_to_srgb_array(linear: np.ndarray) -> np.ndarray:
+    """(..., 3) linear RGB to 8-bit sRGB integers (inverse of LINEAR_CHANNEL_TABLE)."""
+    linear = np.clip(linear, 0, 1)
+    encoded = np.where(
+        linear <= 0.0031308, linear * 12.92, 1.055 * np.power(linear, 1 / 2.4) - 0.055
+    )
+    return np.rint(encoded * 255).astype(np.int64)
+
+
+def min_contrast_array(luminances: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Row-wise min_contrast_pair for a (p, n) luminance array.
+
+    Returns the minimum ratios (p,) and the sorted index pairs (p, 2).
+    """
+    palettes, size = luminances.shape
+    if size < 2:
+        return np.zeros(palettes), np.zeros((palettes, 2), dtype=np.int64)
+    order = np.argsort(luminances, axis=1, kind="stable")
+    ordered = np.take_along_axis(luminances, order, axis=1)
+    ratios = (ordered[:, 1:] + 0.05) / (ordered[:, :-1] + 0.05)
+    position = np.argmin(ratios, axis=1)
+    rows = np.arange(palettes)
+    pairs = np.stack([order[rows, position], order[rows, position + 1]], axis=1)
+    return ratios[rows, position], np.sort(pairs, axis=1)
+
+
+# Dichromacy simulation matrices for linear RGB at full severity
+# (Machado, Oliveira & Fernandes, 2009).
+CVD_MATRICES = {
+    "protanopia": np.array(
+        [
+            [0.152286, 1.052583, -0.204868],
+            [0.114503, 0.786281, 0.099216],
+            [-0.003882, -0.048116, 1.051998],
+        ]
+    ),
+    "deuteranopia": np.array(
+        [
+            [0.367322, 0.860646, -0.227968],
+            [0.280085, 0.672501, 0.047413],
+            [-0.011820, 0.042940, 0.968881],
+        ]
+    ),
+    "tritanopia": np.array(
+        [
+            [1.255528, -0.076749, -0.178779],
+            [-0.078411, 0.930809, 0.147602],
+            [0.004733, 0.691367, 0.303900],
+        ]
+    ),
+}
+CVD_TYPES = tuple(CVD_MATRICES)
+CVD_STACK = np.stack([CVD_MATRICES[name] for name in CVD_TYPES])
+# OKLab distance below which two swatches are easily confused.
+CVD_MIN_DISTANCE = 0.05
+
+
+def simulate_cvd_array(rgb: np.ndarray) -> np.ndarray:
+    """OKLab colors of (..., 3) 8-bit sRGB as seen with each CVD_TYPES entry.
+
+    Every deficiency is applied in one matrix product over the whole input;
+    the result has shape (len(CVD_TYPES), ..., 3).
+    """
+    channels = np.clip(np.asarray(rgb, dtype=np.int64), 0, 255)
+    linear = LINEAR_CHANNEL_TABLE[channels]
+    simulated = np.einsum("kij,...j->k...i", CVD_STACK, linear)
+    return linear_rgb_to_oklab_array(np.clip(simulated, 0, 1))
+
+
+def min_distance_array(lab: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Minimum pairwise distance within each palette of a (p, n, 3) array.
+
+    Returns the distances (p,) and the sorted index pairs (p, 2).
+    """
+    palettes, size = lab.shape[:2]
+    if size < 2:
+        return np.zeros(palettes), np.zeros((palettes, 2), dtype=np.int64)
+    distances = np.sqrt(((lab[:, :, None, :] - lab[:, None, :, :]) ** 2).sum(axis=-1))
+    distances[:, np.tril(np.ones((size, size), dtype=bool))] = np.inf
+    flat = np.argmin(distances.reshape(palettes, -1), axis=1)
+    rows = np.arange(palettes)
+    pairs = np.stack([flat // size, flat % size], axis=1)
+    return distances.reshape(palettes, -1)[rows, flat], pairs
+
+
+def cvd_reports(rgb: np.ndarray) -> List[Dict[str, object]]:
+    """Distinguishability report under every deficiency for a (p, n, 3) sRGB array."""
+    palettes, size = rgb.shape[:2]
+    # Row 0 is unimpaired vision, the baseline the simulations compare against.
+    views = np.concatenate([srgb_to_oklab_array(rgb)[None], simulate_cvd_array(rgb)])
+    distances, pairs = min_distance_array(views.reshape(len(views) * palettes, size, 3))
+    distances = distances.reshape(len(views), palettes).tolist()
+    pairs = pairs.reshape(len(views), palettes, 2).tolist()
+    reports = []
+    for palette_index in range(palettes):
+        simulations = {}
+        confused = []
+        for type_index, name in enumerate(CVD_TYPES, start=1):
+            distance = distances[type_index][palette_index]
+            pair = pairs[type_index][palette_index] if size > 1 else None
+            distinguishable = pair is None or distance >= CVD_MIN_DISTANCE
+            simulations[name] = {
+                "min_distance": round(distance, 4),
+                "pair": pair,
+                "distinguishable": distinguishable,
             }
-        }
-    }
+            if not distinguishable:
+                confused.append(f"{name} ({pair[0] + 1} y {pair[1] + 1})")
+        note = (
+            "Colores que se confunden con " + ", ".join(confused) + "; separa su luminosidad."
+            if confused
+            else "Los colores siguen distinguiéndose con protanopia, deuteranopia y tritanopia."
+        )
+        reports.append(
+            {
+                "threshold": CVD_MIN_DISTANCE,
+                "baseline": {
+                    "min_distance": round(distances[0][palette_index], 4),
+                    "pair": pairs[0][palette_index] if size > 1 else None,
+                },
+                "distinguishable": not confused,
+                "simulations": simulations,
+                "note": note,
+            }
+        )
+    return reports
 
 
-def export_tokens_to_figma(palette: List[Dict[str, object]]) -> Dict[str, object]:
-    tokens = build_design_tokens(palette)
-    return {
-        "colors": {
-            name: {"value": value, "type": "color"} for name, value in tokens.items()
+def generate_palettes_batch(
+    specs: Iterable[Union[PaletteSpec, Sequence[object]]],
+) -> List[Dict[str, object]]:
+    """Generate many palettes at once; output matches generate_palette exactly.
+
+    Specs may be PaletteSpec instances or (sentiment, style, seed, count[, idea,
+    brand_hint]) tuples. Sampling still uses one random.Random per spec so seeds
+    stay reproducible, but every color conversion, luminance, text color and
+    contrast computation runs as array operations over the whole batch.
+    """
+    specs = [spec if isinstance(spec, PaletteSpec) else PaletteSpec(*spec) for spec in specs]
+    with timed_stage("resolve"):
+        resolved = []
+        for spec in specs:
+            profile, style_key = resolve_profile(spec.sentiment, spec.style, spec.idea)
+            resolved.append((seed_base_hues(profile, spec.base_hues), style_key))
+
+    with timed_stage("colors"):
+        samples = []
+        text_overrides: List[List[str] | None] = []
+        text_reports: List[Dict[str, object] | None] = []
+        for spec, (profile, _style_key) in zip(specs, resolved):
+            palette_samples = sample_hsla(profile, spec.count, spec.seed)
+            texts = report = None
+            if spec.target_contrast is not None:
+                palette_samples, texts, report = repair_contrast(
+                    palette_samples, profile, spec.target_contrast
+                )
+            samples.append(palette_samples)
+            text_overrides.append(texts)
+            text_reports.append(report)
+        flat = [sample for palette_samples in samples for sample in palette_samples]
+        hsla = np.array([sample[:3] for sample in flat], dtype=np.int64).reshape(-1, 3)
+        rgb = hsl_to_rgb_array(hsla[:, 0], hsla[:, 1], hsla[:, 2])
+        hsl = rgb_to_hsl_array(rgb)
+        luminance = relative_luminance_array(rgb)
+        dark_text = luminance > 0.6
+
+    with timed_stage("contrast"):
+        offsets = np.cumsum([0] + [len(palette_samples) for palette_samples in samples])
+        min_contrasts = np.zeros(len(specs))
+        min_pairs = np.zeros((len(specs), 2), dtype=np.int64)
+        sizes = np.diff(offsets)
+        for size in np.unique(sizes):
+            members = np.flatnonzero(sizes == size)
+            rows = offsets[members][:, None] + np.arange(size)
+            min_contrasts[members], min_pairs[members] = min_contrast_array(luminance[rows])
+
+    cvd: List[Dict[str, object] | None] = [None] * len(specs)
+    wanted = np.array([spec.simulate_cvd for spec in specs], dtype=bool)
+    if wanted.any():
+        with timed_stage("cvd"):
+            for size in np.unique(sizes[wanted]):
+                members = np.flatnonzero(wanted & (sizes == size))
+                rows = offsets[members][:, None] + np.arange(size)
+                for member, report in zip(members.tolist(), cvd_reports(rgb[rows])):
+                    cvd[member] = report
+
+    rgb_rows = rgb.tolist()
+    hsl_rows = hsl.tolist()
+    dark_rows = dark_text.tolist()
+    luminance_rows = luminance.tolist()
+    pair_rows = min_pairs.tolist()
+    results = []
+    for palette_index, (spec, (profile, style_key)) in enumerate(zip(specs, resolved)):
+        colors = []
+        start = int(offsets[palette_index])
+        for index, (hue, saturation, lightness, alpha) in enumerate(samples[palette_index]):
+            r, g, b = rgb_rows[start + index]
+            h, s, l = hsl_rows[start + index]
+            colors.append(
+                {
+                    "name": f"Color {index + 1}",
+                    "hue": hue,
+                    "saturation": saturation,
+                    "lightness": lightness,
+                    "formats": {
+                        "rgb": f"rgb({r}, {g}, {b})",
+                        "rgba": f"rgba({r}, {g}, {b}, {alpha:.2f})",
+                        "hex": f"#{r:02X}{g:02X}{b:02X}",
+                        "hsl": f"hsl({h}, {s}%, {l}%)",
+                        "hsla": f"hsla({h}, {s}%, {l}%, {alpha:.2f})",
+                    },
+                    "text": (
+                        text_overrides[palette_index][index]
+                        if text_overrides[palette_index]
+                        else (DARK_TEXT if dark_rows[start + index] else LIGHT_TEXT)
+                    ),
+                }
+            )
+        matrix = None
+        if spec.full_contrast_matrix:
+            matrix = contrast_matrix(luminance_rows[start:start + len(colors)])
+        results.append(
+            build_palette_result(
+                spec.sentiment,
+                spec.idea,
+                profile,
+                style_key,
+                spec.brand_hint,
+                colors,
+                float(min_contrasts[palette_index]),
+                tuple(pair_rows[palette_index]) if len(colors) > 1 else None,
+                matrix,
+                text_reports[palette_index],
+                cvd[palette_index],
+            )
+        )
+    return results
+
+
+def generate_palette_bundle(
+    sentiment: str,
+    idea: str,
+    count: int,
+    seed: int | None,
+    style: str | None,
+    brand_hint: str | None,
+    full_contrast_matrix: bool = False,
+    target_contrast: str | float | None = None,
+    simulate_cvd: bool = False,
+    base_hues: Sequence[int] | None = None,
+) -> Tuple[Dict[str, object], List[Dict[str, object]]]:
+    """Main palette plus its AI variations, generated in a single batch."""
+    main_spec = PaletteSpec(
+        sentiment,
+        style,
+        seed,
+        count,
+        idea,
+        brand_hint,
+        full_contrast_matrix,
+        target_contrast,
+        simulate_cvd,
+        tuple(base_hues) if base_hues else None,
+    )
+    palettes = generate_palettes_batch([main_spec, *ai_variation_specs(sentiment, idea, count, seed)])
+    return palettes[0], palettes[1:]
+
+
+class PackedPalette:
+    """Palette colors packed into one array of shorts, eight per color.
+
+    Each color is stored as hue, saturation, lightness, r, g, b, alpha in
+    hundredths and a text-color index; the string formats are rendered only
+    when ``to_colors`` is called. ``from_colors`` only accepts colors that
+    render back identically, so packing never changes API output.
+    """
+
+    __slots__ = ("values", "names")
+
+    FIELDS = 8
+    TEXT_COLORS = (DARK_TEXT, LIGHT_TEXT)
+
+    def __init__(self, values: array, names: Tuple[str, ...] | None = None) -> None:
+        self.values = values
+        self.names = names
+
+    def __len__(self) -> int:
+        return len(self.values) // self.FIELDS
+
+    @classmethod
+    def from_colors(cls, colors: List[Dict[str, object]]) -> "PackedPalette":
+        values = array("h")
+        names = []
+        try:
+            for color in colors:
+                formats = color["formats"]
+                hex_value = formats["hex"]
+                alpha = round(float(formats["rgba"].rsplit(",", 1)[1].rstrip(") ")) * 100)
+                values.extend(
+                    (
+                        color["hue"],
+                        color["saturation"],
+                        color["lightness"],
+                        int(hex_value[1:3], 16),
+                        int(hex_value[3:5], 16),
+                        int(hex_value[5:7], 16),
+                        alpha,
+                        cls.TEXT_COLORS.index(color["text"]),
+                    )
+                )
+                names.append(color["name"])
+        except (KeyError, IndexError, TypeError, ValueError, OverflowError, AttributeError):
+            raise ValueError("Color no empaquetable.") from None
+        default_names = all(name == f"Color {index}" for index, name in enumerate(names, start=1))
+        packed = cls(values, None if default_names else tuple(names))
+        if packed.to_colors() != colors:
+            raise ValueError("Color no empaquetable.")
+        return packed
+
+    def color(self, index: int) -> Dict[str, object]:
+        start = index * self.FIELDS
+        hue, saturation, lightness, r, g, b, alpha, text = self.values[start:start + self.FIELDS]
+        return {
+            "name": self.names[index] if self.names else f"Color {index + 1}",
+            "hue": hue,
+            "saturation": saturation,
+            "lightness": lightness,
+            "formats": format_color(r, g, b, alpha / 100),
+            "text": self.TEXT_COLORS[text],
         }
-    }
+
+    def to_colors(self) -> List[Dict[str, object]]:
+        return [self.color(index) for index in range(len(self))]
+
+    def to_compact(self) -> Dict[str, object]:
+        compact: Dict[str, object] = {"packed": self.values.tolist()}
+        if self.names:
+            compact["names"] = list(self.names)
+        return compact
+
+    @classmethod
+    def from_compact(cls, compact: Dict[str, object]) -> "PackedPalette":
+        names = compact.get("names")
+        return cls(array("h", compact["packed"]), tuple(names) if names else None)
+
+
+def pack_palette_result(value: object) -> object:
+    """Replace the color list of a result (or list of results) with a PackedPalette."""
+    if isinstance(value, list):
+        return [pack_palette_result(item) for item in value]
+    if isinstance(value, dict) and isinstance(value.get("palette"), list):
+        try:
+            return {**value, "palette": PackedPalette.from_colors(value["palette"])}
+        except ValueError:
+            return value
+    return value
+
+
+def unpack_palette_result(value: object) -> object:
+    """Inverse of pack_palette_result; also accepts the ``to_compact`` JSON form."""
+    if isinstance(value, list):
+        return [unpack_palette_result(item) for item in value]
+    if not isinstance(value, dict):
+        return value
+    palette = value.get("palette")
+    if isinstance(palette, dict) and "packed" in palette:
+        palette = PackedPalette.from_compact(palette)
+    if isinstance(palette, PackedPalette):
+        return {**value, "palette": palette.to_colors()}
+    return value
+
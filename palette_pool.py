@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""Warm pools of pre-generated palettes for unseeded requests."""
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections import OrderedDict, deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Set
+
+from palette_core import PaletteSpec, pack_palette_result, unpack_palette_result
+
+logger = logging.getLogger(__name__)
+
+PaletteFill = Callable[[List[PaletteSpec]], Awaitable[List[Dict[str, Any]]]]
+
+
+class PalettePool:
+    """Per-key queues of ready palettes, topped up by a background task.
+
+    Every pooled palette is generated with fresh randomness and handed out
+    exactly once (``popleft``), so consecutive requests keep seeing different
+    palettes. A key is registered on its first request (or by ``warm``) and
+    is refilled in batches whenever it drops to ``refill_at`` entries. At
+    most ``max_keys`` keys are kept; registering another one evicts the
+    least recently taken. When a pool is empty ``take`` returns None and the
+    caller generates inline.
+    """
+
+    def __init__(self, size: int = 8, refill_at: Optional[int] = None, max_keys: int = 512) -> None:
+        self.size = size
+        self.refill_at = size // 2 if refill_at is None else refill_at
+        self.max_keys = max_keys
+        self.hits = 0
+        self.misses = 0
+        self._pools: Dict[str, Deque[Dict[str, Any]]] = {}
+        self._specs: "OrderedDict[str, PaletteSpec]" = OrderedDict()
+        self._pending: Set[str] = set()
+        self._queue: Optional["asyncio.Queue[str]"] = None
+        self._task: Optional[asyncio.Task] = None
+        self._fill: Optional[PaletteFill] = None
+
+    async def start(self, fill: PaletteFill) -> None:
+        if self.size <= 0 or self._task is not None:
+            return
+        self._fill = fill
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run())
+        for key in self._specs:
+            self._schedule(key)
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self._queue = None
+        self._pending.clear()
+
+    def warm(self, entries: Dict[str, PaletteSpec]) -> None:
+        for key, spec in entries.items():
+            if self._register(key, spec):
+                self._schedule(key)
+
+    def take(self, key: str, spec: PaletteSpec) -> Optional[Dict[str, Any]]:
+        if self.size <= 0:
+            return None
+        pool = self._pools.get(key)
+        palette = unpack_palette_result(pool.popleft()) if pool else None
+        if palette is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        if self._register(key, spec) and len(self._pools[key]) <= self.refill_at:
+            self._schedule(key)
+        return palette
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "keys": len(self._pools),
+            "size": sum(len(pool) for pool in self._pools.values()),
+        }
+
+    def _register(self, key: str, spec: PaletteSpec) -> bool:
+        if key in self._specs:
+            self._specs.move_to_end(key)
+            return True
+        if self.max_keys <= 0:
+            return False
+        if len(self._specs) >= self.max_keys:
+            evicted, _spec = self._specs.popitem(last=False)
+            del self._pools[evicted]
+        self._specs[key] = spec
+        self._pools[key] = deque()
+        return True
+
+    def _schedule(self, key: str) -> None:
+        if self._queue is not None and key not in self._pending:
+            self._pending.add(key)
+            self._queue.put_nowait(key)
+
+    async def _run(self) -> None:
+        assert self._queue is not None and self._fill is not None
+        queue = self._queue
+        while True:
+            keys = [await queue.get()]
+            while not queue.empty():
+                keys.append(queue.get_nowait())
+            specs: List[PaletteSpec] = []
+            wanted = []
+            for key in keys:
+                if key not in self._specs:
+                    continue  # evicted while queued
+                missing = self.size - len(self._pools[key])
+                wanted.append((key, missing))
+                specs.extend([self._specs[key]] * missing)
+            try:
+                palettes = await self._fill(specs) if specs else []
+                packed = await asyncio.to_thread(pack_palette_result, palettes)
+            except Exception:
+                logger.exception("Could not refill %d palette pools", len(keys))
+            else:
+                position = 0
+                for key, missing in wanted:
+                    pool = self._pools.get(key)
+                    if pool is not None:
+                        pool.extend(packed[position:position + missing])
+                    position += missing
+            finally:
+                self._pending.difference_update(keys)
@@ -0,0 +1,432 @@
+#!/usr/bin/env python3
+"""Content-addressed preset persistence backed by SQLite (via SQLAlchemy)."""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import (
+    Column,
+    Index,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    Text,
+    bindparam,
+    create_engine,
+    event,
+    inspect,
+    select,
+    text,
+)
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Connection, Engine
+
+import serializers
+from palette_core import PackedPalette
+
+logger = logging.getLogger(__name__)
+
+metadata = MetaData()
+
+presets_table = Table(
+    "presets",
+    metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("created_at", String(40), nullable=False),
+    Column("sentiment", Text),
+    Column("idea", Text),
+    Column("style", String(40)),
+    Column("brand_hint", Text),
+    Column("palette", Text, nullable=False),
+    Column("content_hash", String(64)),
+    Column("hits", Integer, nullable=False, server_default="1"),
+    sqlite_autoincrement=True,
+)
+
+# Each filterable column is indexed together with the id so that a filtered,
+# cursor-paginated listing is a single index range scan.
+PRESET_INDEXES = (
+    Index("ix_presets_sentiment_id", presets_table.c.sentiment, presets_table.c.id),
+    Index("ix_presets_style_id", presets_table.c.style, presets_table.c.id),
+    Index("ix_presets_brand_hint_id", presets_table.c.brand_hint, presets_table.c.id),
+    Index("ix_presets_created_at_id", presets_table.c.created_at, presets_table.c.id),
+    Index("ux_presets_content_hash", presets_table.c.content_hash, unique=True),
+)
+
+PRESET_FIELDS = ("created_at", "sentiment", "idea", "style", "brand_hint")
+
+
+def _configure_sqlite(dbapi_connection: Any, _record: Any) -> None:
+    cursor = dbapi_connection.cursor()
+    # WAL lets several uvicorn workers append while others read, and
+    # busy_timeout makes concurrent writers wait instead of failing.
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA busy_timeout=5000")
+    cursor.close()
+
+
+class PresetStore:
+    """Stores one row per distinct preset.
+
+    Rows are keyed by ``content_hash`` (normalized inputs plus colors);
+    saving a preset that already exists only increments its ``hits``.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        legacy_json_path: Optional[str] = None,
+        compact_every: int = 1000,
+    ) -> None:
+        self.url = url
+        self.legacy_json_path = legacy_json_path
+        self.compact_every = compact_every
+        self._engine: Optional[Engine] = None
+        self._lock = threading.Lock()
+        self._appends_since_compact = 0
+        self._listeners: List[Callable[[List[Dict[str, Any]]], None]] = []
+
+    def add_listener(self, listener: Callable[[List[Dict[str, Any]]], None]) -> None:
+        """Call ``listener`` with every batch of newly stored entries (with their ids)."""
+        self._listeners.append(listener)
+
+    def _notify(self, entries: List[Dict[str, Any]]) -> None:
+        for listener in self._listeners:
+            try:
+                listener(entries)
+            except Exception:
+                logger.exception("Preset listener failed")
+
+    @property
+    def engine(self) -> Engine:
+        if self._engine is None:
+            with self._lock:
+                if self._engine is None:
+                    self._engine = self._open()
+        return self._engine
+
+    def _open(self) -> Engine:
+        if self.url.startswith("sqlite:///"):
+            database_path = self.url[len("sqlite:///"):]
+            directory = os.path.dirname(database_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+        engine = create_engine(self.url, future=True)
+        if engine.dialect.name == "sqlite":
+            event.listen(engine, "connect", _configure_sqlite)
+        is_new = not inspect(engine).has_table(presets_table.name)
+        metadata.create_all(engine)
+        if not is_new:
+            self._migrate_schema(engine)
+        for index in PRESET_INDEXES:
+            index.create(engine, checkfirst=True)
+        if is_new:
+            self._import_legacy_json(engine)
+        return engine
+
+    def _migrate_schema(self, engine: Engine) -> None:
+        """Add the content-hash columns to databases created before deduplication."""
+        columns = {column["name"] for column in inspect(engine).get_columns(presets_table.name)}
+        if "content_hash" in columns:
+            return
+        with engine.begin() as connection:
+            connection.execute(text("ALTER TABLE presets ADD COLUMN content_hash VARCHAR(64)"))
+            connection.execute(
+                text("ALTER TABLE presets ADD COLUMN hits INTEGER NOT NULL DEFAULT 1")
+            )
+            _deduplicate(connection)
+
+    def _import_legacy_json(self, engine: Engine) -> None:
+        if not self.legacy_json_path or not os.path.exists(self.legacy_json_path):
+            return
+        with open(self.legacy_json_path, "r", encoding="utf-8") as file:
+            entries = json.load(file)
+        if entries:
+            with engine.begin() as connection:
+                _upsert(connection, entries)
+
+    def import_json(self, path: str) -> Tuple[int, int]:
+        """Merge a presets.json-style file; returns (entries read, new presets)."""
+        with open(path, "r", encoding="utf-8") as file:
+            entries = json.load(file)
+        if not entries:
+            return 0, 0
+        with self.engine.begin() as connection:
+            results = _upsert(connection, entries)
+        return len(entries), sum(1 for _preset_id, hits in results if hits == 1)
+
+    def deduplicate(self) -> Tuple[int, int]:
+        """Merge rows with the same content into one (hits summed); returns (kept, removed)."""
+        with self.engine.begin() as connection:
+            return _deduplicate(connection)
+
+    def append(self, entry: Dict[str, Any]) -> int:
+        return self.append_many([entry])[0]
+
+    def append_many(self, entries: List[Dict[str, Any]]) -> List[int]:
+        """Store entries (duplicates only bump ``hits``); returns their preset ids."""
+        if not entries:
+            return []
+        with self.engine.begin() as connection:
+            results = _upsert(connection, entries)
+        for _entry in entries:
+            self._maybe_compact()
+        created = [
+            {**entry, "id": preset_id}
+            for entry, (preset_id, hits) in zip(entries, results)
+            if hits == 1
+        ]
+        if created and self._listeners:
+            self._notify(created)
+        return [preset_id for preset_id, _hits in results]
+
+    def load_all(self) -> List[Dict[str, Any]]:
+        query = select(presets_table).order_by(presets_table.c.id)
+        with self.engine.connect() as connection:
+            return [_from_row(row) for row in connection.execute(query).mappings()]
+
+    def load_after(self, preset_id: int) -> List[Dict[str, Any]]:
+        """Entries with an id above ``preset_id``, in insertion order."""
+        query = (
+            select(presets_table)
+            .where(presets_table.c.id > preset_id)
+            .order_by(presets_table.c.id)
+        )
+        with self.engine.connect() as connection:
+            return [_from_row(row) for row in connection.execute(query).mappings()]
+
+    def get(self, preset_id: int) -> Optional[Dict[str, Any]]:
+        query = select(presets_table).where(presets_table.c.id == preset_id)
+        with self.engine.connect() as connection:
+            row = connection.execute(query).mappings().first()
+        return _from_row(row) if row is not None else None
+
+    def get_many(self, preset_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        query = select(presets_table).where(presets_table.c.id.in_(preset_ids))
+        with self.engine.connect() as connection:
+            return {row["id"]: _from_row(row) for row in connection.execute(query).mappings()}
+
+    def query(
+        self,
+        limit: int = 50,
+        cursor: Optional[int] = None,
+        sentiment: Optional[str] = None,
+        style: Optional[str] = None,
+        brand_hint: Optional[str] = None,
+        created_from: Optional[str] = None,
+        created_to: Optional[str] = None,
+    ) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        """Return one page of presets in insertion order and the next cursor."""
+        columns = presets_table.c
+        query = select(presets_table).order_by(columns.id).limit(limit)
+        if cursor is not None:
+            query = query.where(columns.id > cursor)
+        if sentiment is not None:
+            query = query.where(columns.sentiment == sentiment)
+        if style is not None:
+            query = query.where(columns.style == style)
+        if brand_hint is not None:
+            query = query.where(columns.brand_hint == brand_hint)
+        if created_from is not None:
+            query = query.where(columns.created_at >= created_from)
+        if created_to is not None:
+            query = query.where(columns.created_at < created_to)
+        with self.engine.connect() as connection:
+            entries = [_from_row(row) for row in connection.execute(query).mappings()]
+        next_cursor = entries[-1]["id"] if len(entries) == limit else None
+        return entries, next_cursor
+
+    def _maybe_compact(self) -> None:
+        if self.compact_every <= 0:
+            return
+        with self._lock:
+            self._appends_since_compact += 1
+            if self._appends_since_compact < self.compact_every:
+                return
+            self._appends_since_compact = 0
+        self.checkpoint()
+
+    def checkpoint(self) -> None:
+        """Fold the write-ahead log back into the main database file."""
+        if self.engine.dialect.name != "sqlite":
+            return
+        with self.engine.connect() as connection:
+            connection.execute(text("PRAGMA wal_checkpoint(TRUNCATE)"))
+
+    def compact(self) -> None:
+        """Checkpoint the WAL and rebuild the database file to reclaim space."""
+        self.checkpoint()
+        if self.engine.dialect.name != "sqlite":
+            return
+        with self.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+            connection.execute(text("VACUUM"))
+
+
+class BackgroundPresetWriter:
+    """Persists presets from an asyncio task so request handlers never block on disk.
+
+    Entries go through a bounded queue (a full queue makes submitters wait)
+    and are written in batches on a worker thread. With ``flush="sync"`` the
+    submitter waits until its entry is stored; with ``flush="background"`` it
+    returns as soon as the entry is queued.
+    """
+
+    def __init__(
+        self,
+        store: PresetStore,
+        maxsize: int = 1000,
+        batch_size: int = 100,
+        flush: str = "background",
+    ) -> None:
+        if flush not in ("background", "sync"):
+            raise ValueError(f"Unknown flush policy: {flush}")
+        self.store = store
+        self.maxsize = maxsize
+        self.batch_size = batch_size
+        self.flush = flush
+        self._queue: Optional["asyncio.Queue[Tuple[Dict[str, Any], Optional[asyncio.Future]]]"] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._queue = asyncio.Queue(maxsize=self.maxsize)
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None or self._queue is None:
+            return
+        await self._queue.join()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self._queue = None
+
+    async def submit(self, entry: Dict[str, Any]) -> None:
+        if self._queue is None:
+            await asyncio.to_thread(self.store.append, entry)
+            return
+        future = asyncio.get_running_loop().create_future() if self.flush == "sync" else None
+        await self._queue.put((entry, future))
+        if future is not None:
+            await future
+
+    async def _run(self) -> None:
+        assert self._queue is not None
+        queue = self._queue
+        while True:
+            batch = [await queue.get()]
+            while len(batch) < self.batch_size and not queue.empty():
+                batch.append(queue.get_nowait())
+            try:
+                await asyncio.to_thread(self.store.append_many, [entry for entry, _ in batch])
+            except Exception as exc:
+                logger.exception("Could not persist %d presets", len(batch))
+                for _entry, future in batch:
+                    if future is not None and not future.done():
+                        future.set_exception(exc)
+            else:
+                for _entry, future in batch:
+                    if future is not None and not future.done():
+                        future.set_result(None)
+            finally:
+                for _item in batch:
+                    queue.task_done()
+
+
+def _normalize_input(value: Any) -> str:
+    return " ".join(str(value or "").split()).lower()
+
+
+def content_hash(row: Dict[str, Any]) -> str:
+    """Hash of the normalized inputs and the stored palette of a row from _to_row."""
+    key = [_normalize_input(row.get(field)) for field in ("sentiment", "idea", "style", "brand_hint")]
+    key.append(row["palette"])
+    return hashlib.sha256(serializers.dumps(key)).hexdigest()
+
+
+def _to_row(entry: Dict[str, Any]) -> Dict[str, Any]:
+    row = {field: entry.get(field) for field in PRESET_FIELDS}
+    palette = entry.get("palette") or []
+    if not isinstance(palette, PackedPalette):
+        try:
+            # Generated palettes are stored packed; anything that does not
+            # pack losslessly is kept verbatim.
+            palette = PackedPalette.from_colors(palette)
+        except ValueError:
+            pass
+    row["palette"] = serializers.dumps_text(palette)
+    row["content_hash"] = content_hash(row)
+    return row
+
+
+def _upsert(connection: Connection, entries: List[Dict[str, Any]]) -> List[Tuple[int, int]]:
+    """Insert entries or bump the hits of existing ones; returns (id, hits) per entry."""
+    dialect = {"sqlite": sqlite, "postgresql": postgresql}[connection.dialect.name]
+    columns = presets_table.c
+    statement = (
+        dialect.insert(presets_table)
+        .on_conflict_do_update(
+            index_elements=[columns.content_hash], set_={"hits": columns.hits + 1}
+        )
+        .returning(columns.id, columns.hits, sort_by_parameter_order=True)
+    )
+    result = connection.execute(statement, [_to_row(entry) for entry in entries])
+    return [(int(preset_id), int(hits)) for preset_id, hits in result]
+
+
+def _deduplicate(connection: Connection) -> Tuple[int, int]:
+    """Rewrite every row in canonical (packed) form and merge rows with equal hashes."""
+    columns = presets_table.c
+    rows = connection.execute(select(presets_table).order_by(columns.id)).mappings()
+    kept: Dict[str, Dict[str, Any]] = {}
+    duplicates: List[int] = []
+    for row in rows:
+        canonical = _to_row(_from_row(row))
+        digest = canonical["content_hash"]
+        hits = row["hits"] or 1
+        if digest in kept:
+            kept[digest]["total"] += hits
+            duplicates.append(row["id"])
+        else:
+            kept[digest] = {
+                "preset_id": row["id"],
+                "digest": digest,
+                "stored_palette": canonical["palette"],
+                "total": hits,
+            }
+    if duplicates:
+        connection.execute(presets_table.delete().where(columns.id.in_(duplicates)))
+    if kept:
+        connection.execute(
+            presets_table.update()
+            .where(columns.id == bindparam("preset_id"))
+            .values(
+                content_hash=bindparam("digest"),
+                palette=bindparam("stored_palette"),
+                hits=bindparam("total"),
+            ),
+            list(kept.values()),
+        )
+    return len(kept), len(duplicates)
+
+
+def _from_row(row: Any) -> Dict[str, Any]:
+    entry = {"id": row["id"]}
+    entry.update({field: row[field] for field in PRESET_FIELDS})
+    entry["hits"] = row["hits"]
+    palette = serializers.loads(row["palette"])
+    if isinstance(palette, dict):
+        palette = PackedPalette.from_compact(palette).to_colors()
+    entry["palette"] = palette
+    return entry
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""Perceptually uniform data-visualization scales built in OKLab/OKLCH."""
+from __future__ import annotations
+
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from palette_core import (
+    PaletteProfile,
+    hsl_to_rgb_array,
+    linear_to_srgb_array,
+    min_distance_array,
+    oklab_to_linear_rgb_array,
+    relative_luminance_array,
+    resolve_profile,
+    seed_base_hues,
+    srgb_to_oklab_array,
+    timed_stage,
+)
+
+SCALE_KINDS = ("sequential", "diverging", "categorical")
+MIN_STEPS = 10
+MAX_STEPS = 1000
+SEQUENTIAL_LIGHTNESS = (0.97, 0.28)
+DIVERGING_LIGHTNESS = (0.42, 0.97)  # ends, center
+CATEGORICAL_LIGHTNESS = (0.68, 0.55, 0.8, 0.47, 0.88, 0.38)
+CATEGORICAL_HUE_STEP = 1.0
+MAX_HUE_DRIFT = 60.0
+GAMUT_ITERATIONS = 24
+GAMUT_TOLERANCE = 1e-6
+MONOTONIC_ROUNDS = 8
+MONOTONIC_ITERATIONS = 20
+
+
+def oklch_to_oklab(lightness: np.ndarray, chroma: np.ndarray, hue: np.ndarray) -> np.ndarray:
+    radians = np.radians(hue)
+    return np.stack([lightness, chroma * np.cos(radians), chroma * np.sin(radians)], axis=-1)
+
+
+def in_gamut(lab: np.ndarray) -> np.ndarray:
+    linear = oklab_to_linear_rgb_array(lab)
+    return np.all((linear >= -GAMUT_TOLERANCE) & (linear <= 1 + GAMUT_TOLERANCE), axis=-1)
+
+
+def clamp_chroma(lightness: np.ndarray, chroma: np.ndarray, hue: np.ndarray) -> np.ndarray:
+    """Largest chroma up to the requested one that stays inside sRGB.
+
+    Lightness and hue are kept; the boundary is found by a binary search run
+    on every color at once.
+    """
+    inside = in_gamut(oklch_to_oklab(lightness, chroma, hue))
+    low = np.zeros_like(chroma)
+    high = chroma.copy()
+    for _ in range(GAMUT_ITERATIONS):
+        middle = (low + high) / 2
+        fits = in_gamut(oklch_to_oklab(lightness, middle, hue))
+        low = np.where(fits, middle, low)
+        high = np.where(fits, high, middle)
+    return np.where(inside, chroma, low)
+
+
+def profile_hues(profile: PaletteProfile) -> np.ndarray:
+    """OKLCH hues (degrees) of the profile's HSL base hues at its mid saturation/lightness."""
+    hues = np.array(profile.base_hues, dtype=np.float64)
+    saturation = np.full_like(hues, sum(profile.saturation_range) / 2)
+    lightness = np.full_like(hues, sum(profile.lightness_range) / 2)
+    lab = srgb_to_oklab_array(hsl_to_rgb_array(hues, saturation, lightness))
+    return np.mod(np.degrees(np.arctan2(lab[:, 2], lab[:, 1])), 360)
+
+
+def peak_chroma(profile: PaletteProfile) -> float:
+    # 0.04 for washed-out profiles up to ~0.18 for fully saturated ones.
+    return 0.04 + 0.14 * profile.saturation_range[1] / 100
+
+
+def hue_delta(start: float, end: float) -> float:
+    return (end - start + 180) % 360 - 180
+
+
+def sequential_lch(steps: int, hues: np.ndarray, chroma: float) -> Tuple[np.ndarray, ...]:
+    """Light to dark ramp, drifting towards the second base hue (at most MAX_HUE_DRIFT)."""
+    t = np.linspace(0, 1, steps)
+    start, end = SEQUENTIAL_LIGHTNESS
+    drift = 0.0
+    if len(hues) > 1:
+        drift = float(np.clip(hue_delta(hues[0], hues[1]), -MAX_HUE_DRIFT, MAX_HUE_DRIFT))
+    lightness = start + (end - start) * t
+    chromas = chroma * (0.2 + 0.8 * np.sin(np.pi * t))
+    return lightness, chromas, np.mod(hues[0] + drift * t, 360)
+
+
+def diverging_lch(steps: int, hues: np.ndarray, chroma: float) -> Tuple[np.ndarray, ...]:
+    """Two hues meeting at a light neutral midpoint."""
+    t = np.linspace(-1, 1, steps)
+    distances = np.abs([hue_delta(hues[0], hue) for hue in hues])
+    other = hues[int(np.argmax(distances))] if distances.max() >= 90 else hues[0] + 180
+    edge, center = DIVERGING_LIGHTNESS
+    lightness = center + (edge - center) * np.abs(t)
+    chromas = chroma * np.abs(t) ** 0.9
+    return lightness, chromas, np.mod(np.where(t < 0, hues[0], other), 360)
+
+
+def categorical_lch(steps: int, hues: np.ndarray, chroma: float) -> Tuple[np.ndarray, ...]:
+    """Base hues first, then the candidate farthest (in OKLab) from every color picked so far.
+
+    Candidates are a hue grid at each CATEGORICAL_LIGHTNESS level, already
+    clamped to sRGB; the greedy max-min pick keeps one distance vector
+    updated instead of recomputing all pairs.
+    """
+    levels = np.array(CATEGORICAL_LIGHTNESS)
+    grid = np.arange(0, 360, CATEGORICAL_HUE_STEP, dtype=np.float64)
+    seeds = min(len(hues), steps)
+    lightness = np.concatenate([levels[np.arange(seeds) % len(levels)], np.repeat(levels, len(grid))])
+    hue = np.concatenate([hues[:seeds], np.tile(grid, len(levels))])
+    chromas = clamp_chroma(lightness, np.full(len(hue), chroma), hue)
+    lab = oklch_to_oklab(lightness, chromas, hue)
+    picked = list(range(seeds))
+    nearest = np.full(len(lab), np.inf)
+    for index in picked:
+        nearest = np.minimum(nearest, ((lab - lab[index]) ** 2).sum(axis=1))
+    while len(picked) < steps:
+        index = int(np.argmax(nearest))
+        picked.append(index)
+        nearest = np.minimum(nearest, ((lab - lab[index]) ** 2).sum(axis=1))
+    return lightness[picked], chromas[picked], hue[picked]
+
+
+SCALE_BUILDERS = {
+    "sequential": sequential_lch,
+    "diverging": diverging_lch,
+    "categorical": categorical_lch,
+}
+
+
+def lch_to_srgb(lightness: np.ndarray, chroma: np.ndarray, hue: np.ndarray) -> Tuple[np.ndarray, ...]:
+    chroma = clamp_chroma(lightness, chroma, hue)
+    rgb = linear_to_srgb_array(oklab_to_linear_rgb_array(oklch_to_oklab(lightness, chroma, hue)))
+    return rgb, chroma
+
+
+def luminance_paths(kind: str, steps: int) -> List[np.ndarray]:
+    """Index paths, from the light end outwards, along which luminance must not rise."""
+    if kind == "sequential":
+        return [np.arange(steps)]
+    # Diverging: both halves walk from the light midpoint to their dark end.
+    return [np.arange((steps - 1) // 2, -1, -1), np.arange(steps // 2, steps)]
+
+
+def srgb_luminance(lightness: np.ndarray, chroma: np.ndarray, hue: np.ndarray) -> np.ndarray:
+    return relative_luminance_array(lch_to_srgb(lightness, chroma, hue)[0])
+
+
+def enforce_monotonic(
+    kind: str, lightness: np.ndarray, chroma: np.ndarray, hue: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray, bool]:
+    """Darken colors until WCAG luminance is monotonic on each side of the scale.
+
+    Gamut clamping and 8-bit rounding can leave a color slightly lighter than
+    the one before it. Each round compares luminance against the running
+    minimum along every path and bisects, for all offending colors at once,
+    the lightness that brings them back under it.
+    """
+    paths = luminance_paths(kind, len(lightness))
+    lightness = lightness.copy()
+    for _ in range(MONOTONIC_ROUNDS):
+        rgb, clamped = lch_to_srgb(lightness, chroma, hue)
+        luminance = relative_luminance_array(rgb)
+        ceiling = np.full_like(luminance, np.inf)
+        for path in paths:
+            ceiling[path] = np.minimum(ceiling[path], np.minimum.accumulate(luminance[path]))
+        wrong = np.flatnonzero(luminance > ceiling)
+        if not len(wrong):
+            return rgb, clamped, True
+        low = np.zeros(len(wrong))
+        high = lightness[wrong]
+        for _ in range(MONOTONIC_ITERATIONS):
+            middle = (low + high) / 2
+            fits = srgb_luminance(middle, chroma[wrong], hue[wrong]) <= ceiling[wrong]
+            low = np.where(fits, middle, low)
+            high = np.where(fits, high, middle)
+        lightness[wrong] = low
+    rgb, clamped = lch_to_srgb(lightness, chroma, hue)
+    luminance = relative_luminance_array(rgb)
+    return rgb, clamped, all((np.diff(luminance[path]) <= 0).all() for path in paths)
+
+
+def build_scale(
+    kind: str, steps: int, profile: PaletteProfile, monotonic: bool = True
+) -> Dict[str, object]:
+    """A ``steps``-color scale for the profile's base hues.
+
+    ``monotonic`` (sequential and diverging only) guarantees that WCAG
+    relative luminance never goes the wrong way along the scale after gamut
+    clamping and rounding; the result reports whether it holds.
+    """
+    if kind not in SCALE_BUILDERS:
+        raise ValueError("Tipo de escala no soportado.")
+    if not MIN_STEPS <= steps <= MAX_STEPS:
+        raise ValueError(f"La escala debe tener entre {MIN_STEPS} y {MAX_STEPS} pasos.")
+    hues = profile_hues(profile)
+    lightness, chroma, hue = SCALE_BUILDERS[kind](steps, hues, peak_chroma(profile))
+    checked = monotonic and kind != "categorical"
+    if checked:
+        rgb, chroma, is_monotonic = enforce_monotonic(kind, lightness, chroma, hue)
+    else:
+        rgb, chroma = lch_to_srgb(lightness, chroma, hue)
+    lab = srgb_to_oklab_array(rgb)
+    rows = rgb.tolist()
+    colors: List[str] = ["#{:02X}{:02X}{:02X}".format(*row) for row in rows]
+    result: Dict[str, object] = {
+        "kind": kind,
+        "steps": steps,
+        "profile": profile.name,
+        "hues": np.round(hues, 2).tolist(),
+        "colors": colors,
+        "oklch": np.round(
+            np.stack(
+                [lab[:, 0], np.hypot(lab[:, 1], lab[:, 2]), np.mod(np.degrees(np.arctan2(lab[:, 2], lab[:, 1])), 360)],
+                axis=1,
+            ),
+            4,
+        ).tolist(),
+        "luminance": np.round(relative_luminance_array(rgb), 4).tolist(),
+        "unique": len(set(colors)),
+        "monotonic": is_monotonic if checked else None,
+    }
+    if kind == "categorical":
+        distance, pair = min_distance_array(lab[None])
+        result["min_distance"] = round(float(distance[0]), 4)
+        result["closest_pair"] = pair[0].tolist()
+    return result
+
+
+def generate_scale(
+    kind: str,
+    steps: int,
+    sentiment: str,
+    idea: str = "",
+    style: str | None = None,
+    monotonic: bool = True,
+    base_hues: Sequence[int] | None = None,
+) -> Dict[str, object]:
+    """build_scale for the profile that generate_palette would use for the same inputs."""
+    with timed_stage("resolve"):
+        profile, style_key = resolve_profile(sentiment, style, idea)
+        profile = seed_base_hues(profile, base_hues)
+    with timed_stage("scale"):
+        result = build_scale(kind, steps, profile, monotonic)
+    result["style"] = style_key
+    return result
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""JSON serialization shared by the web app, the CLI and preset storage.
+
+Uses orjson when it is installed (``pip install orjson``) and the standard
+library otherwise; both produce the same compact UTF-8 output. Set
+``PALETTE_JSON=stdlib`` to force the fallback.
+"""
+from __future__ import annotations
+
+import json
+import os
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+if os.environ.get("PALETTE_JSON", "auto") == "stdlib":
+    orjson = None
+
+BACKEND = "orjson" if orjson is not None else "stdlib"
+
+
+def _default(value: Any) -> Any:
+    # Packed palettes (and anything else exposing to_compact) serialize compactly.
+    to_compact = getattr(value, "to_compact", None)
+    if to_compact is None:
+        raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+    return to_compact()
+
+
+def dumps(value: Any) -> bytes:
+    """Compact UTF-8 JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(value, default=_default)
+    return json.dumps(
+        value, ensure_ascii=False, separators=(",", ":"), default=_default
+    ).encode("utf-8")
+
+
+def dumps_text(value: Any) -> str:
+    return dumps(value).decode("utf-8")
+
+
+def dumps_pretty(value: Any) -> str:
+    """Two-space indented JSON for humans (CLI output)."""
+    if orjson is not None:
+        return orjson.dumps(value, default=_default, option=orjson.OPT_INDENT_2).decode("utf-8")
+    return json.dumps(value, ensure_ascii=False, indent=2, default=_default)
+
+
+def loads(data: bytes | str) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""Perceptual (OKLab) nearest-neighbour search over stored preset colors."""
+from __future__ import annotations
+
+import heapq
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from palette_core import PackedPalette, parse_hex, srgb_to_oklab_array
+
+
+class KDTree:
+    """Static k-d tree over an (n, d) array with exact k-nearest-neighbour queries."""
+
+    def __init__(self, points: np.ndarray, leaf_size: int = 16) -> None:
+        self.points = points
+        self.leaf_size = leaf_size
+        self.order = np.arange(len(points))
+        # Node arrays: split dimension (-1 for leaves), split value, children
+        # and the [start, end) slice of ``order`` covered by the node.
+        self.dims: List[int] = []
+        self.values: List[float] = []
+        self.children: List[Tuple[int, int]] = []
+        self.bounds: List[Tuple[int, int]] = []
+        if len(points):
+            self._build(0, len(points))
+
+    def __len__(self) -> int:
+        return len(self.points)
+
+    def _build(self, start: int, end: int) -> int:
+        node = len(self.dims)
+        self.dims.append(-1)
+        self.values.append(0.0)
+        self.children.append((-1, -1))
+        self.bounds.append((start, end))
+        if end - start <= self.leaf_size:
+            return node
+        subset = self.points[self.order[start:end]]
+        dim = int(np.argmax(subset.max(axis=0) - subset.min(axis=0)))
+        middle = (end - start) // 2
+        partition = np.argpartition(subset[:, dim], middle)
+        self.order[start:end] = self.order[start:end][partition]
+        self.dims[node] = dim
+        self.values[node] = float(self.points[self.order[start + middle], dim])
+        left = self._build(start, start + middle)
+        right = self._build(start + middle, end)
+        self.children[node] = (left, right)
+        return node
+
+    def query(self, point: np.ndarray, k: int) -> List[Tuple[float, int]]:
+        """The k nearest points as (squared distance, row index), closest first."""
+        if not len(self.points) or k <= 0:
+            return []
+        heap: List[Tuple[float, int]] = []  # max-heap on distance via negation
+        stack = [0]
+        while stack:
+            node = stack.pop()
+            dim = self.dims[node]
+            if dim < 0:
+                start, end = self.bounds[node]
+                rows = self.order[start:end]
+                distances = ((self.points[rows] - point) ** 2).sum(axis=1)
+                if len(heap) == k:
+                    keep = distances < -heap[0][0]
+                    rows, distances = rows[keep], distances[keep]
+                for distance, row in zip(distances.tolist(), rows.tolist()):
+                    if len(heap) < k:
+                        heapq.heappush(heap, (-distance, row))
+                    elif distance < -heap[0][0]:
+                        heapq.heapreplace(heap, (-distance, row))
+                continue
+            left, right = self.children[node]
+            offset = float(point[dim]) - self.values[node]
+            near, far = (left, right) if offset < 0 else (right, left)
+            if len(heap) < k or offset * offset < -heap[0][0]:
+                stack.append(far)
+            stack.append(near)
+        return sorted((-distance, row) for distance, row in heap)
+
+
+def palette_rgb(palette: Any) -> List[Tuple[int, int, int]]:
+    """RGB triples from a PackedPalette, color dicts (API/preset shape) or hex strings."""
+    if isinstance(palette, PackedPalette):
+        values = palette.values
+        return [
+            tuple(values[start + 3:start + 6])
+            for start in range(0, len(values), PackedPalette.FIELDS)
+        ]
+    rgb = []
+    for color in palette:
+        if isinstance(color, str):
+            rgb.append(parse_hex(color))
+        elif isinstance(color, dict) and isinstance(color.get("formats"), dict):
+            rgb.append(parse_hex(color["formats"].get("hex", "")))
+    return rgb
+
+
+def to_oklab(palette: Any) -> np.ndarray:
+    rgb = palette_rgb(palette)
+    if not rgb:
+        return np.zeros((0, 3))
+    return srgb_to_oklab_array(np.array(rgb))
+
+
+class PresetSimilarityIndex:
+    """OKLab index over every color of every preset.
+
+    New presets go to a small buffer that is scanned with NumPy; once the
+    buffer outgrows a quarter of the tree (and ``min_rebuild`` colors) the
+    k-d tree is rebuilt, so inserts stay cheap and queries stay sublinear.
+    Palette queries collect candidate presets from each query color's
+    nearest neighbours and rank them by the symmetric average of
+    closest-color distances.
+
+    ``refresh`` reads presets stored since the last refresh by id, so
+    writes from other server processes are picked up as well as the ones
+    this process reports through ``add_entries``.
+    """
+
+    def __init__(self, min_rebuild: int = 512, leaf_size: int = 16) -> None:
+        self.min_rebuild = min_rebuild
+        self.leaf_size = leaf_size
+        self.loaded = False
+        self._synced_id = 0
+        self._palettes: Dict[int, np.ndarray] = {}
+        self._tree = KDTree(np.zeros((0, 3)), leaf_size)
+        self._tree_owners = np.zeros(0, dtype=np.int64)
+        self._buffer: List[np.ndarray] = []
+        self._buffer_owners: List[int] = []
+        self._buffer_points: Optional[np.ndarray] = None
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._palettes)
+
+    def refresh(self, load_after: Callable[[int], Iterable[Dict[str, Any]]]) -> None:
+        """Index the entries ``load_after(last id)`` returns in id order; the first call loads all."""
+        entries = list(load_after(self._synced_id))
+        with self._lock:
+            if not self.loaded:
+                self._palettes = {}
+                for entry in entries:
+                    self._store(entry)
+                self._rebuild()
+                self.loaded = True
+            else:
+                self._append(entry for entry in entries if int(entry["id"]) not in self._palettes)
+            if entries:
+                # Only ids read here advance the cursor: entries reported by
+                # add_entries may overtake other processes' pending writes.
+                self._synced_id = max(self._synced_id, int(entries[-1]["id"]))
+
+    def add_entries(self, entries: Iterable[Dict[str, Any]]) -> None:
+        with self._lock:
+            if not self.loaded:
+                # Not loaded yet: refresh() will read these from the store.
+                return
+            self._append(entries)
+
+    def _append(self, entries: Iterable[Dict[str, Any]]) -> None:
+        for entry in entries:
+            for lab in self._store(entry):
+                self._buffer.append(lab)
+                self._buffer_owners.append(int(entry["id"]))
+        self._buffer_points = None
+        if len(self._buffer) > max(self.min_rebuild, len(self._tree) // 4):
+            self._rebuild()
+
+    def _store(self, entry: Dict[str, Any]) -> np.ndarray:
+        try:
+            lab = to_oklab(entry.get("palette") or [])
+        except ValueError:
+            lab = np.zeros((0, 3))
+        self._palettes[int(entry["id"])] = lab
+        return lab
+
+    def _rebuild(self) -> None:
+        owners = [
+            np.full(len(lab), preset_id, dtype=np.int64) for preset_id, lab in self._palettes.items()
+        ]
+        points = [lab for lab in self._palettes.values()]
+        self._tree = KDTree(np.vstack(points) if points else np.zeros((0, 3)), self.leaf_size)
+        self._tree_owners = np.concatenate(owners) if owners else np.zeros(0, dtype=np.int64)
+        self._buffer = []
+        self._buffer_owners = []
+        self._buffer_points = None
+
+    def nearest_colors(self, lab: np.ndarray, k: int) -> List[Tuple[float, int]]:
+        """(distance, preset id) of the k stored colors closest to one OKLab point."""
+        matches = [
+            (distance, int(self._tree_owners[row])) for distance, row in self._tree.query(lab, k)
+        ]
+        if self._buffer:
+            if self._buffer_points is None:
+                self._buffer_points = np.array(self._buffer)
+            distances = ((self._buffer_points - lab) ** 2).sum(axis=1)
+            nearest = np.argsort(distances)[:k]
+            matches.extend((float(distances[row]), self._buffer_owners[row]) for row in nearest)
+        return [(float(np.sqrt(distance)), owner) for distance, owner in sorted(matches)[:k]]
+
+    def query(
+        self, palette: Any, k: int = 5, exclude: Optional[int] = None
+    ) -> List[Tuple[int, float]]:
+        """The k presets closest to a color or palette as (preset id, distance)."""
+        query_lab = to_oklab(palette)
+        if not len(query_lab):
+            return []
+        with self._lock:
+            if len(query_lab) == 1:
+                ranked: Dict[int, float] = {}
+                # Over-fetch because several colors of one preset may be close.
+                for distance, owner in self.nearest_colors(query_lab[0], k * 8):
+                    if owner != exclude and owner not in ranked:
+                        ranked[owner] = distance
+                return sorted(ranked.items(), key=lambda item: item[1])[:k]
+            candidates = set()
+            for lab in query_lab:
+                candidates.update(owner for _distance, owner in self.nearest_colors(lab, k * 8))
+            candidates.discard(exclude)
+            scored = [
+                (preset_id, palette_distance(query_lab, self._palettes[preset_id]))
+                for preset_id in candidates
+                if len(self._palettes.get(preset_id, ()))
+            ]
+        return sorted(scored, key=lambda item: item[1])[:k]
+
+
+def palette_distance(left: np.ndarray, right: np.ndarray) -> float:
+    """Symmetric mean closest-color distance between two OKLab palettes."""
+    distances = np.sqrt(((left[:, None, :] - right[None, :, :]) ** 2).sum(axis=2))
+    return float((distances.min(axis=1).mean() + distances.min(axis=0).mean()) / 2)
@@ -27,6 +27,9 @@ const layoutFooter = document.getElementById("layout-footer");
 let paletteState = [];
 let selectedIndex = 0;
 let baseHue = 210;
+let editorSocket = null;
+let pendingEdits = new Map();
+let editFrame = null;
 
 const toPayload = () => ({
   sentiment: form.sentiment.value,
@@ -66,7 +69,7 @@ const renderPalette = (data) => {
     box.style.background = color.formats.hex;
 
     const info = document.createElement("div");
-    const textColor = getBestTextColor(color.formats.hex);
+    const textColor = color.text || getBestTextColor(color.formats.hex);
     const chipStyle = textColor === "#f8fafc" ? "#111827" : "#ffffff";
     info.innerHTML = `
       <strong>${color.name}</strong><br />
@@ -292,6 +295,8 @@ const updateSelectedColor = (hex, alpha) => {
   paletteState[selectedIndex].hue = hsl.h;
   paletteState[selectedIndex].saturation = hsl.s;
   paletteState[selectedIndex].lightness = hsl.l;
+  delete paletteState[selectedIndex].text;
+  queueEdit(selectedIndex, { hex: hex.toUpperCase(), alpha: Number(alpha) });
   renderPalette({ palette: paletteState, contrast: { min_ratio: "-", note: "Personalizado" } });
 };
 
@@ -324,58 +329,99 @@ const syncControlsWithSelection = () => {
   updateTriad(hex);
 };
 
-const fetchPalette = async () => {
-  const response = await fetch("/api/palette", {
-    method: "POST",
-    headers: { "Content-Type": "application/json" },
-    body: JSON.stringify(toPayload()),
+const renderTokens = (exports) => {
+  const content = exports?.[form.format.value];
+  if (content === undefined) return;
+  tokensEl.textContent =
+    typeof content === "string" ? content : JSON.stringify(content, null, 2);
+};
+
+const handleEditorMessage = (event) => {
+  const message = JSON.parse(event.data);
+  if (message.type === "error") {
+    contrastText.textContent = `Error: ${message.error}`;
+    return;
+  }
+  if (message.type === "state") {
+    selectedIndex = Math.min(selectedIndex, message.palette.length - 1);
+    renderPalette({ palette: message.palette, contrast: message.contrast });
+  } else if (message.type === "update") {
+    // Keep the local colors (sliders may have moved on); take the server's text colors.
+    Object.entries(message.colors).forEach(([index, color]) => {
+      if (paletteState[index]) paletteState[index].text = color.text;
+    });
+    renderPalette({ palette: paletteState, contrast: message.contrast });
+  }
+  renderTokens(message.exports);
+};
+
+const connectEditor = () => {
+  const protocol = window.location.protocol === "https:" ? "wss" : "ws";
+  editorSocket = new WebSocket(`${protocol}://${window.location.host}/ws/editor`);
+  editorSocket.addEventListener("message", handleEditorMessage);
+  editorSocket.addEventListener("close", () => {
+    editorSocket = null;
   });
-  const data = await response.json();
-  if (!response.ok) {
-    return { error: data.detail || "No se pudo generar la paleta." };
+};
+
+const editorReady = () => editorSocket && editorSocket.readyState === WebSocket.OPEN;
+
+const flushEdits = () => {
+  editFrame = null;
+  if (!editorReady()) {
+    pendingEdits.clear();
+    return;
+  }
+  pendingEdits.forEach((edit) => editorSocket.send(JSON.stringify(edit)));
+  pendingEdits.clear();
+};
+
+// Slider input fires far more often than the screen refreshes: keep only the
+// latest edit per color and send them once per animation frame.
+const queueEdit = (index, changes) => {
+  pendingEdits.set(index, { type: "edit", index, ...changes });
+  if (editFrame === null) {
+    editFrame = window.requestAnimationFrame(flushEdits);
+  }
+};
+
+const sendEditor = (message) => {
+  if (editFrame !== null) {
+    window.cancelAnimationFrame(editFrame);
+  }
+  flushEdits();
+  if (editorReady()) {
+    editorSocket.send(JSON.stringify(message));
   }
-  return data;
 };
 
-const fetchTokens = async () => {
+const fetchBundle = async () => {
   const payload = toPayload();
-  payload.format = form.format.value;
-  const response = await fetch("/api/export", {
+  payload.formats = [form.format.value];
+  const response = await fetch("/api/bundle", {
     method: "POST",
     headers: { "Content-Type": "application/json" },
     body: JSON.stringify(payload),
   });
   const data = await response.json();
   if (!response.ok) {
-    return { error: data.detail || data.error || "No se pudo exportar." };
+    return { error: data.detail || data.error || "No se pudo generar la paleta." };
   }
   return data;
 };
 
-const fetchAiPalettes = async () => {
-  const response = await fetch("/api/ai-palettes", {
-    method: "POST",
-    headers: { "Content-Type": "application/json" },
-    body: JSON.stringify(toPayload()),
-  });
-  return response.json();
-};
-
 form.addEventListener("submit", async (event) => {
   event.preventDefault();
-  const palette = await fetchPalette();
-  renderPalette(palette);
-  const ai = await fetchAiPalettes();
-  renderAiPalettes(ai);
-  const tokens = await fetchTokens();
-  if (tokens.error) {
-    tokensEl.textContent = tokens.error;
+  const bundle = await fetchBundle();
+  if (bundle.error) {
+    renderPalette(bundle);
+    tokensEl.textContent = bundle.error;
     return;
   }
-  tokensEl.textContent =
-    typeof tokens.content === "string"
-      ? tokens.content
-      : JSON.stringify(tokens.content, null, 2);
+  renderPalette(bundle.palette);
+  renderAiPalettes({ palettes: bundle.ai_palettes });
+  renderTokens(bundle.exports);
+  sendEditor({ type: "load", palette: bundle.palette.palette, formats: [form.format.value] });
 });
 
 paletteContainer.addEventListener("click", (event) => {
@@ -389,9 +435,10 @@ paletteContainer.addEventListener("click", (event) => {
 colorWheel.addEventListener("input", () => {
   const newHue = hexToHsl(colorWheel.value).h;
   const delta = newHue - baseHue;
-  paletteState = paletteState.map((color) => {
+  paletteState = paletteState.map((color, index) => {
     const nextHue = (color.hue + delta + 360) % 360;
     const nextHex = hslToHex(nextHue, color.saturation, color.lightness);
+    queueEdit(index, { hue: nextHue });
     return {
       ...color,
       hue: nextHue,
@@ -438,11 +485,13 @@ addColorButton.addEventListener("click", () => {
     },
   });
   selectedIndex = paletteState.length - 1;
+  sendEditor({ type: "add", hex: hex.toUpperCase(), alpha: Number(alphaSlider.value) });
   renderPalette({ palette: paletteState, contrast: { min_ratio: "-", note: "Personalizado" } });
 });
 
 deleteColorButton.addEventListener("click", () => {
   if (paletteState.length <= 1) return;
+  sendEditor({ type: "delete", index: selectedIndex });
   paletteState.splice(selectedIndex, 1);
   selectedIndex = Math.max(0, selectedIndex - 1);
   renderPalette({ palette: paletteState, contrast: { min_ratio: "-", note: "Personalizado" } });
@@ -536,3 +585,5 @@ pageType.addEventListener("change", () => {
     pageRecommendation.textContent = "";
   }
 });
+
+connectEditor();
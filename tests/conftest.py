@@ -0,0 +1,9 @@
+import os
+import tempfile
+
+# Default settings on the smallest host, with a scratch preset database;
+# set before any test imports app.
+os.environ.setdefault("PALETTE_WORKERS", "1")
+os.environ.setdefault(
+    "PRESETS_DB_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'presets.db')}"
+)
@@ -0,0 +1,68 @@
+import asyncio
+
+import pytest
+
+from admission import AdmissionController, AdmissionRejected
+
+
+def test_only_costs_above_the_burst_are_refused():
+    controller = AdmissionController(capacity=8, rate=20, burst=60)
+
+    async def scenario():
+        with pytest.raises(AdmissionRejected) as rejected:
+            await controller.admit("a", 61, bulk=False)
+        assert rejected.value.status == 413
+        # Larger than the capacity, but it runs alone on an idle server.
+        assert await controller.admit("a", 51.2, bulk=False) == 51.2
+
+    asyncio.run(scenario())
+
+
+def test_oversized_request_waits_for_the_server_to_empty():
+    controller = AdmissionController(capacity=8, rate=0, burst=1, queue_timeout=1)
+
+    async def scenario():
+        small = await controller.admit("a", 2, bulk=False)
+        big = asyncio.ensure_future(controller.admit("b", 20, bulk=False))
+        await asyncio.sleep(0)
+        assert not big.done()
+        controller.release(small)
+        assert await big == 20
+        assert controller.in_flight == 20
+
+    asyncio.run(scenario())
+
+
+def test_stream_chunks_wait_instead_of_failing():
+    controller = AdmissionController(capacity=8, rate=0, burst=1)
+
+    async def scenario():
+        held = await controller.admit("a", 8, bulk=False)
+        chunk = asyncio.ensure_future(controller.reserve("b", 4))
+        await asyncio.sleep(0)
+        assert not chunk.done()
+        controller.release(held)
+        assert await chunk == 4
+
+    asyncio.run(scenario())
+
+
+def test_default_app_admits_bulk_sized_requests():
+    from fastapi.testclient import TestClient
+
+    import app as web_app
+
+    assert web_app.ADMISSION_RATE > 0 and web_app.ADMISSION_CAPACITY > 0
+    with TestClient(web_app.app) as client:
+        response = client.post("/api/palette", json={"sentiment": "calma", "count": 256})
+        assert response.status_code == 200
+        assert len(response.json()["palette"]) == 256
+
+        items = [{"sentiment": "calma", "seed": seed} for seed in range(40)]
+        response = client.post("/api/palettes/stream", params={"save": "false"}, json=items)
+        assert response.status_code == 200
+        lines = response.text.splitlines()
+        assert len(lines) == 40 and all('"palette"' in line for line in lines)
+
+        response = client.post("/api/palette", json={"sentiment": "calma", "count": 10**6})
+        assert response.status_code == 413
@@ -0,0 +1,24 @@
+import io
+
+import pytest
+from PIL import Image
+
+from brand_colors import LOGO_MAX_FULL_PIXELS, LogoTooLarge, decode_logo
+
+
+def encode(fmt: str, size) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", size, (30, 90, 200)).save(buffer, fmt)
+    return buffer.getvalue()
+
+
+def test_non_draftable_logos_are_capped_before_decoding():
+    side = int(LOGO_MAX_FULL_PIXELS ** 0.5) + 1
+    with pytest.raises(LogoTooLarge):
+        decode_logo(encode("PNG", (side, side)))
+
+
+def test_large_jpeg_logos_decode_at_reduced_scale():
+    side = int(LOGO_MAX_FULL_PIXELS ** 0.5) + 1
+    pixels = decode_logo(encode("JPEG", (side, side)))
+    assert len(pixels) <= 96 * 96
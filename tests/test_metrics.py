@@ -0,0 +1,40 @@
+import asyncio
+import contextvars
+from functools import partial
+
+import metrics
+
+
+class BusyProfile:
+    """cProfile.Profile as seen on Python 3.12+ while another profiler runs."""
+
+    def enable(self):
+        raise ValueError("Another profiling tool is already active")
+
+    def disable(self):
+        pass
+
+
+def test_profiled_requests_survive_an_active_profiler(monkeypatch, tmp_path):
+    async def app(scope, receive, send):
+        work = metrics.profiled(lambda: sum(range(1000)))
+        call = partial(contextvars.copy_context().run, work)
+        value = await asyncio.get_running_loop().run_in_executor(None, call)
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": str(value).encode()})
+
+    monkeypatch.setattr(metrics.cProfile, "Profile", BusyProfile)
+    middleware = metrics.TimingMiddleware(app, profile_slow_ms=0.001, profile_dir=str(tmp_path))
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": "GET", "path": "/"}
+    asyncio.run(middleware(scope, receive, send))
+    asyncio.run(middleware(scope, receive, send))
+    assert [message["status"] for message in sent if "status" in message] == [200, 200]
+    assert sent[-1]["body"] == b"499500"
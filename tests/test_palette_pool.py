@@ -0,0 +1,34 @@
+import asyncio
+
+from palette_core import PaletteSpec, generate_palettes_batch
+from palette_pool import PalettePool
+
+
+def test_least_recently_taken_keys_are_evicted():
+    pool = PalettePool(size=2, max_keys=2)
+
+    async def fill(specs):
+        return generate_palettes_batch(specs)
+
+    async def scenario():
+        await pool.start(fill)
+        spec = PaletteSpec("calma", None, None, 5)
+        for key in ("a", "b"):
+            pool.take(key, spec)
+        await asyncio.sleep(0.2)
+        assert pool.take("a", spec) is not None
+        # "b" is now the least recently taken key and makes room for "junk".
+        pool.take("junk", spec)
+        await asyncio.sleep(0.2)
+        await pool.stop()
+
+    asyncio.run(scenario())
+    assert pool.stats()["keys"] == 2
+    assert sorted(pool._specs) == ["a", "junk"]
+
+
+def test_unknown_styles_are_not_pooled():
+    import app as web_app
+
+    assert web_app.palette_pool_key(web_app.PaletteRequest(sentiment="calma", style="zzz")) is None
+    assert web_app.palette_pool_key(web_app.PaletteRequest(sentiment="calma")) is not None
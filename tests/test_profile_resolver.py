@@ -0,0 +1,36 @@
+from palette_core import PROFILE_RESOLVER, _edit_distance
+
+
+def test_adjacent_swap_costs_one_edit():
+    assert _edit_distance("calam", "calma", 1) == 1
+    assert _edit_distance("amro", "amor", 1) == 1
+    assert _edit_distance("kitten", "sitting", 3) == 3
+
+
+def test_edit_distance_gives_up_past_limit():
+    assert _edit_distance("abcd", "wxyz", 1) == 2
+
+
+def test_transposed_sentiments_resolve():
+    assert PROFILE_RESOLVER.match_sentiment("calam") == "calma"
+    assert PROFILE_RESOLVER.match_sentiment("amro") == "amor"
+    assert PROFILE_RESOLVER.match_sentiment("Cálam") == "calma"
+
+
+def test_unrelated_sentiment_falls_back_to_default():
+    profile, _style = PROFILE_RESOLVER.resolve("xyzw", None)
+    assert profile.name == PROFILE_RESOLVER.default
+
+
+def test_idea_phrases_respect_accents_and_idioms():
+    default = PROFILE_RESOLVER.default
+    assert PROFILE_RESOLVER.resolve("", None, "La web irá dirigida a niños")[0].name == default
+    assert PROFILE_RESOLVER.resolve("", None, "vale la pena probar")[0].name == default
+    assert PROFILE_RESOLVER.resolve("", None, "Una marca llena de alegría")[0].name == "alegria"
+    assert PROFILE_RESOLVER.resolve("", None, "alegria para niños")[0].name == "alegria"
+    assert PROFILE_RESOLVER.resolve("", None, "mucha ira contenida")[0].name == "ira"
+
+
+def test_fuzzy_match_does_not_stretch_short_words():
+    assert PROFILE_RESOLVER.match_sentiment("cálido") is None
+    assert PROFILE_RESOLVER.match_sentiment("tranquilida") == "calma"
@@ -0,0 +1,34 @@
+from palette_core import generate_palette
+from preset_store import PresetStore
+from similarity_index import PresetSimilarityIndex
+
+
+def entry(sentiment, seed):
+    palette = generate_palette(sentiment, "", 5, seed, None, None)
+    return {
+        "created_at": "2026-01-01T00:00:00+00:00",
+        "sentiment": palette["sentiment"],
+        "idea": "",
+        "style": palette["style"],
+        "brand_hint": None,
+        "palette": palette["palette"],
+    }
+
+
+def test_refresh_picks_up_presets_saved_by_other_workers(tmp_path):
+    url = f"sqlite:///{tmp_path / 'presets.db'}"
+    ours, theirs = PresetStore(url), PresetStore(url)
+    index = PresetSimilarityIndex()
+    ours.add_listener(index.add_entries)
+    ours.append(entry("calma", 1))
+    index.refresh(ours.load_after)
+    assert len(index) == 1
+
+    ours.append(entry("ira", 2))
+    [other_id] = theirs.append_many([entry("alegria", 3)])
+    assert len(index) == 2
+    index.refresh(ours.load_after)
+    assert len(index) == 3
+
+    colors = theirs.get(other_id)["palette"]
+    assert index.query(colors, k=1)[0][0] == other_id
@@ -0,0 +1,51 @@
+import asyncio
+import json
+
+import pytest
+
+import app as web_app
+
+ITEMS = [{"sentiment": "calma", "seed": seed} for seed in range(100)]
+
+
+def run_and_disconnect(content_type: bytes, body: bytes) -> int:
+    """Send the whole body, then report the client as gone; returns the lines written."""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": "/api/palettes/stream",
+        "raw_path": b"/api/palettes/stream",
+        "query_string": b"save=false",
+        "headers": [(b"content-type", content_type), (b"host", b"test")],
+        "client": ("127.0.0.1", 1234),
+        "server": ("test", 80),
+    }
+    messages = [{"type": "http.request", "body": body, "more_body": False}]
+    chunks = []
+
+    async def receive():
+        if messages:
+            return messages.pop(0)
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    asyncio.run(web_app.app(scope, receive, send))
+    return len(b"".join(chunks).splitlines())
+
+
+@pytest.mark.parametrize(
+    "content_type, body",
+    [
+        (b"application/x-ndjson", "\n".join(json.dumps(item) for item in ITEMS).encode()),
+        (b"application/json", json.dumps(ITEMS).encode()),
+    ],
+    ids=["ndjson", "json"],
+)
+def test_stream_stops_after_client_disconnects(content_type, body):
+    assert run_and_disconnect(content_type, body) < len(ITEMS)